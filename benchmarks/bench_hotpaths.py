@@ -0,0 +1,122 @@
+import os
+import json
+import time
+import random
+import argparse
+import itertools
+import tempfile
+import platform
+import subprocess
+from serializers import get_serializer
+from storage import CharacterRepository, JsonFileBackend, atomic_write
+from benchmarks.synthetic import make_database, make_scores
+import main as game
+
+AVATAR_URL = 'https://cdn.discordapp.com/embed/avatars/0.png'
+
+def timeit(func, iterations, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            func()
+        best = min(best, time.perf_counter() - start)
+    return best / iterations
+
+def load_repository(root, size):
+    serializer = get_serializer('compact')
+    db_path = os.path.join(root, f'database_{size}.json')
+    hiscore_path = os.path.join(root, f'hiscore_{size}.json')
+    atomic_write(db_path, serializer.dumps(make_database(size)))
+    atomic_write(hiscore_path, serializer.dumps(make_scores()))
+
+    repository = CharacterRepository(JsonFileBackend(db_path, hiscore_path, serializer))
+    start = time.perf_counter()
+    repository.load()
+    return repository, time.perf_counter() - start
+
+def bench_size(root, size, iterations, repeat):
+    repository, load_seconds = load_repository(root, size)
+    game.characters = repository
+    game.HighScoreSystem.load(repository.load_scores(game.HighScoreSystem.LIMIT))
+
+    rng = random.Random(size)
+    players = list(repository.values())
+    player = rng.choice(players)
+    names = [rng.choice(players).name for _ in range(iterations)] + [f"missing{i}" for i in range(iterations)]
+    name_iter = itertools.cycle(names)
+
+    combat = game.CombatSystem(player)
+    combat.monster = combat.next_monster
+    combat.combat_log = ["🗡️ You deal 7 damage!", "☠️ Monster deals 3 damage!", "✨ You evaded the attack!"]
+
+    levels = iter(range(10 ** 9))
+    monster_hp = itertools.cycle(range(1, 101))
+
+    def render_frame():
+        combat.monster.hp = next(monster_hp)
+        return combat.create_combat_embed()
+
+    def record_score():
+        game.HighScoreSystem.record_score(player.user_id, player.name, next(levels), 'bench#0001')
+
+    def flush_dirty():
+        for char in players[:100]:
+            repository.save(char)
+        repository.flush()
+
+    cases = {
+        'generate_loot': lambda: game.combat_engine.LootSystem.generate_loot(player.luk),
+        'generate_monster': combat.generate_monster,
+        'create_combat_embed': render_frame,
+        'create_combat_embed_hit': combat.create_combat_embed,
+        'create_profile_embed': lambda: game.Utils.create_profile_embed(player, AVATAR_URL),
+        'save_player_data': combat.save_player_data,
+        'character_name_exists': lambda: repository.name_exists(next(name_iter)),
+        'record_score': record_score
+    }
+
+    results = [{'characters': size, 'case': 'repository_load', 'us': load_seconds * 1e6}]
+    for name, func in cases.items():
+        results.append({'characters': size, 'case': name, 'us': timeit(func, iterations, repeat) * 1e6})
+    results.append({'characters': size, 'case': 'flush_100_dirty', 'us': timeit(flush_dirty, 1, repeat) * 1e6})
+    repository.close()
+    return results
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the bot's hot paths against synthetic databases")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--iterations', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', help="Write the results as JSON to this path")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as root:
+        for size in args.sizes:
+            results.extend(bench_size(root, size, args.iterations, args.repeat))
+
+    print(f"{'chars':>8} {'case':<24} {'us/call':>12}")
+    for row in results:
+        print(f"{row['characters']:>8} {row['case']:<24} {row['us']:>12.2f}")
+
+    if args.output:
+        report = {
+            'revision': git_revision(),
+            'python': platform.python_version(),
+            'date': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'iterations': args.iterations,
+            'repeat': args.repeat,
+            'results': results
+        }
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=4)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+import json
+import time
+import argparse
+from serializers import SERIALIZERS
+from benchmarks.synthetic import make_database
+
+def best_of(repeat, func, *args):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def run(sizes, repeat):
+    results = []
+    for size in sizes:
+        data = make_database(size)
+        for name, serializer in SERIALIZERS.items():
+            encoded = serializer.dumps(data)
+            results.append({
+                'characters': size,
+                'serializer': name,
+                'bytes': len(encoded),
+                'dump_ms': best_of(repeat, serializer.dumps, data) * 1000,
+                'load_ms': best_of(repeat, serializer.loads, encoded) * 1000
+            })
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare persisted state serializers")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', help="Write the results as JSON to this path")
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.repeat)
+
+    print(f"{'chars':>8} {'serializer':<10} {'bytes':>12} {'dump ms':>10} {'load ms':>10}")
+    for row in results:
+        print(
+            f"{row['characters']:>8} {row['serializer']:<10} {row['bytes']:>12} "
+            f"{row['dump_ms']:>10.2f} {row['load_ms']:>10.2f}"
+        )
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=4)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+import os
+import json
+import random
+import asyncio
+import argparse
+import tempfile
+import multiprocessing
+import cluster
+from storage import CharacterRepository, SqliteBackend
+
+def assign_players(args):
+    rng = random.Random(args.seed)
+    owners = {
+        shard_id: cluster_id
+        for cluster_id in range(args.processes)
+        for shard_id in cluster.shard_ids_for(cluster_id, args.processes, args.shards)
+    }
+    guilds = [rng.randrange(1 << 40, 1 << 62) for _ in range(args.guilds)]
+    assignments = {cluster_id: [] for cluster_id in range(args.processes)}
+    for i in range(args.players):
+        user_id = 200000000000000000 + i
+        for guild_id in rng.sample(guilds, min(args.guilds_per_user, len(guilds))):
+            assignments[owners[cluster.shard_for_guild(guild_id, args.shards)]].append((user_id, guild_id))
+    return assignments
+
+def run_worker(cluster_id, args, assignments, db_path, results):
+    cluster.CLUSTER_ID = cluster_id
+    cluster.SHARD_COUNT = args.shards
+    cluster.SHARD_IDS = cluster.shard_ids_for(cluster_id, args.processes, args.shards)
+    from benchmarks import load_test
+
+    args.seed += cluster_id * args.players * args.guilds_per_user
+    repository = CharacterRepository(SqliteBackend(db_path), flush_interval=args.flush_interval)
+    try:
+        report = asyncio.run(load_test.run_load(args, repository, assignments))
+    except Exception as e:
+        results.put((cluster_id, {'error': f"{type(e).__name__}: {e}"}))
+        raise
+    results.put((cluster_id, report))
+
+def check_store(db_path):
+    backend = SqliteBackend(db_path)
+    try:
+        leases = backend.conn.execute("SELECT COUNT(*) FROM owners").fetchone()[0]
+        characters = CharacterRepository._decode(backend.load())
+        rows = backend.conn.execute("SELECT COUNT(*) FROM characters").fetchone()[0]
+    finally:
+        backend.close()
+    return {'characters': len(characters), 'invalid': rows - len(characters), 'leases_left': leases}
+
+def main():
+    from benchmarks import load_test
+
+    parser = argparse.ArgumentParser(description="Run the load test across several processes sharing one SQLite store")
+    load_test.add_load_arguments(parser)
+    parser.add_argument('--processes', type=int, default=2)
+    parser.add_argument('--shards', type=int, default=4)
+    parser.add_argument('--guilds', type=int, default=50)
+    parser.add_argument('--guilds-per-user', type=int, default=2, help="Guilds each user plays in, which may land on different processes")
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix='clustertest-')
+    db_path = os.path.join(root, 'roguelike.db')
+    SqliteBackend(db_path).close()
+
+    assignments = assign_players(args)
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    workers = [
+        context.Process(target=run_worker, args=(cluster_id, args, assignments[cluster_id], db_path, results))
+        for cluster_id in range(args.processes)
+    ]
+    for worker in workers:
+        worker.start()
+    reports = dict(results.get() for _ in workers)
+    for worker in workers:
+        worker.join()
+
+    for cluster_id in sorted(reports):
+        report = reports[cluster_id]
+        shard_ids = cluster.shard_ids_for(cluster_id, args.processes, args.shards)
+        print(f"== cluster {cluster_id} (shards {shard_ids})")
+        if 'error' in report:
+            print(f"failed: {report['error']}")
+            continue
+        load_test.print_report(len(assignments[cluster_id]), report)
+
+    completed = [report for report in reports.values() if 'error' not in report]
+    fights = sum(report['fights'] for report in completed)
+    elapsed = max((report['elapsed_s'] for report in completed), default=0)
+    store = check_store(db_path)
+    print(f"== total: {fights} fights ({fights / elapsed if elapsed else 0:.1f}/s), "
+          f"{sum(report['busy'] for report in completed)} busy, {sum(report['errors'] for report in completed)} errors")
+    print(f"Store: {store['characters']} characters, {store['invalid']} invalid, {store['leases_left']} leases left")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'clusters': reports, 'store': store, 'data_dir': root}, f, indent=4)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+import asyncio
+import itertools
+import time
+import discord
+
+_ids = itertools.count(900000000000000000)
+
+class FakeAvatar:
+    def __init__(self, user_id):
+        self.url = f"https://cdn.discordapp.com/embed/avatars/{int(user_id) % 5}.png"
+
+class FakeUser:
+    def __init__(self, user_id, name=None):
+        self.id = int(user_id)
+        self.name = name or f"player{user_id}"
+        self.display_name = self.name
+        self.avatar = FakeAvatar(user_id)
+
+    def __str__(self):
+        return self.name
+
+class FakeChannel:
+    def __init__(self, gateway, channel_id=None, guild_id=None):
+        self.gateway = gateway
+        self.id = channel_id or next(_ids)
+        self.guild_id = guild_id
+
+class FakeMessage:
+    def __init__(self, gateway, channel, content=None, embed=None, view=None):
+        self.gateway = gateway
+        self.channel = channel
+        self.id = next(_ids)
+        self.content = content
+        self.embed = embed
+        self.view = view
+        self.edits = 0
+        self.deleted = False
+
+    async def edit(self, content=None, embed=None, view=None):
+        await self.gateway.api_call()
+        if self.deleted:
+            raise discord.NotFound(FakeHTTPResponse(404), "Unknown Message")
+        if content is not None:
+            self.content = content
+        if embed is not None:
+            self.embed = embed
+        self.view = view
+        self.edits += 1
+        self.gateway.edits += 1
+        return self
+
+    async def delete(self):
+        await self.gateway.api_call()
+        self.deleted = True
+
+class FakeHTTPResponse:
+    def __init__(self, status):
+        self.status = status
+        self.reason = "Fake"
+
+class FakeResponse:
+    def __init__(self, interaction):
+        self._interaction = interaction
+        self._done = False
+
+    def is_done(self):
+        return self._done
+
+    def _respond(self):
+        if self._done:
+            raise discord.InteractionResponded(self._interaction)
+        self._done = True
+        self._interaction.responded_at = time.perf_counter()
+
+    async def send_message(self, content=None, embed=None, view=None, ephemeral=False):
+        self._respond()
+        await self._interaction.gateway.api_call()
+        message = FakeMessage(self._interaction.gateway, self._interaction.channel, content, embed, view)
+        message.ephemeral = ephemeral
+        self._interaction.sent.append(message)
+        self._interaction.original = message
+
+    async def defer(self, ephemeral=False, thinking=False):
+        self._respond()
+        await self._interaction.gateway.api_call()
+
+    async def edit_message(self, content=None, embed=None, view=None):
+        self._respond()
+        message = self._interaction.message
+        await message.edit(content=content, embed=embed, view=view)
+
+    async def send_modal(self, modal):
+        self._respond()
+        await self._interaction.gateway.api_call()
+        self._interaction.modal = modal
+
+class FakeInteraction:
+    def __init__(self, gateway, user, channel, message=None):
+        self.gateway = gateway
+        self.user = user
+        self.channel = channel
+        self.message = message
+        self.guild_id = channel.guild_id
+        self.response = FakeResponse(self)
+        self.original = None
+        self.sent = []
+        self.modal = None
+        self.created_at = time.perf_counter()
+        self.responded_at = None
+
+    async def original_response(self):
+        return self.original
+
+    @property
+    def response_latency(self):
+        if self.responded_at is None:
+            return None
+        return self.responded_at - self.created_at
+
+class FakeGateway:
+    def __init__(self, api_latency=0.0):
+        self.api_latency = api_latency
+        self.users = {}
+        self.edits = 0
+        self.api_calls = 0
+
+    async def api_call(self):
+        self.api_calls += 1
+        if self.api_latency:
+            await asyncio.sleep(self.api_latency)
+        else:
+            await asyncio.sleep(0)
+
+    def user(self, user_id):
+        user = self.users.get(int(user_id))
+        if user is None:
+            user = self.users[int(user_id)] = FakeUser(user_id)
+        return user
+
+    async def fetch_user(self, user_id):
+        await self.api_call()
+        return self.user(user_id)
+
+    def channel(self, channel_id=None, guild_id=None):
+        return FakeChannel(self, channel_id, guild_id)
+
+    def interaction(self, user, channel, message=None):
+        return FakeInteraction(self, user, channel, message)
+
+def find_button(view, label):
+    for item in view.children:
+        if isinstance(item, discord.ui.Button) and item.label and item.label.startswith(label) and not item.disabled:
+            return item
+    return None
+
+async def click(view, label, interaction):
+    button = find_button(view, label)
+    if button is None:
+        raise LookupError(f"No enabled button starting with {label!r}")
+    await button.callback(interaction)
+    return interaction
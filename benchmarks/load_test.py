@@ -0,0 +1,272 @@
+import os
+import json
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+from storage import CharacterRepository, JsonFileBackend
+from benchmarks.synthetic import make_character
+from benchmarks.fake_discord import FakeGateway, click, find_button
+from models import Character
+import main as game
+
+def percentile(samples, fraction):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+class LoadStats:
+    def __init__(self):
+        self.response = {}
+        self.complete = {}
+        self.loop_lag = []
+        self.fights = 0
+        self.deaths = 0
+        self.busy = 0
+        self.errors = 0
+
+    def record(self, name, interaction, elapsed):
+        if interaction.response_latency is not None:
+            self.response.setdefault(name, []).append(interaction.response_latency)
+        self.complete.setdefault(name, []).append(elapsed)
+
+    def summary(self, elapsed, gateway):
+        commands = {}
+        for name in sorted(self.complete):
+            response = self.response.get(name, [])
+            complete = self.complete[name]
+            commands[name] = {
+                'count': len(complete),
+                'response_p50_ms': (percentile(response, 0.5) or 0) * 1000,
+                'response_p99_ms': (percentile(response, 0.99) or 0) * 1000,
+                'complete_p50_ms': percentile(complete, 0.5) * 1000,
+                'complete_p99_ms': percentile(complete, 0.99) * 1000
+            }
+        return {
+            'elapsed_s': elapsed,
+            'fights': self.fights,
+            'fights_per_s': self.fights / elapsed,
+            'deaths': self.deaths,
+            'busy': self.busy,
+            'errors': self.errors,
+            'edits': gateway.edits,
+            'edits_per_s': gateway.edits / elapsed,
+            'edit_queue': {
+                'sent': game.edit_queue.sent,
+                'dropped_frames': game.edit_queue.dropped_frames,
+                'skipped_duplicates': game.edit_queue.skipped_duplicates,
+                'depth': game.edit_queue.depth
+            },
+            'loop_lag_p50_ms': (percentile(self.loop_lag, 0.5) or 0) * 1000,
+            'loop_lag_p99_ms': (percentile(self.loop_lag, 0.99) or 0) * 1000,
+            'loop_lag_max_ms': max(self.loop_lag, default=0) * 1000,
+            'commands': commands
+        }
+
+async def monitor_loop_lag(stats, interval=0.05):
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        stats.loop_lag.append(max(0.0, time.perf_counter() - start - interval))
+
+class SimulatedPlayer:
+    def __init__(self, gateway, stats, user_id, channel, rng, args):
+        self.gateway = gateway
+        self.stats = stats
+        self.user = gateway.user(user_id)
+        self.user_id = str(user_id)
+        self.channel = channel
+        self.rng = rng
+        self.args = args
+
+    async def ensure_character(self):
+        if not await game.SessionManager.claim(self.user_id):
+            return
+        if not game.characters.exists(self.user_id):
+            game.characters.save(Character.from_dict(make_character(self.user_id, self.rng)), reason='create')
+        game.SessionManager.release(self.user_id)
+
+    async def invoke(self, name, command, **kwargs):
+        interaction = self.gateway.interaction(self.user, self.channel)
+        start = time.perf_counter()
+        await command.callback(interaction, **kwargs)
+        self.stats.record(name, interaction, time.perf_counter() - start)
+        if interaction.original is not None and interaction.original.content == game.BUSY_MESSAGE:
+            self.stats.busy += 1
+        return interaction
+
+    async def press(self, name, message, label=None, button=None):
+        interaction = self.gateway.interaction(self.user, self.channel, message)
+        start = time.perf_counter()
+        if button is not None:
+            await button.callback(interaction)
+        else:
+            await click(message.view, label, interaction)
+        self.stats.record(name, interaction, time.perf_counter() - start)
+        return interaction
+
+    async def think(self):
+        await asyncio.sleep(self.rng.uniform(0, self.args.think))
+
+    async def combat_session(self):
+        auto = self.rng.random() < self.args.auto
+        interaction = await self.invoke('combat', game.combat, auto=auto)
+        message = interaction.original
+        if message is None or message.embed is None:
+            return
+
+        for fight in range(self.args.fights):
+            self.stats.fights += 1
+            if message.view is None:
+                self.stats.deaths += 1
+                return
+            if fight == self.args.fights - 1:
+                break
+
+            await self.think()
+            player = game.characters.get(self.user_id)
+            if any(player.pots.values()) and self.rng.random() < self.args.potions:
+                await self.press('use_potion', message, "Use Potion")
+                pots = [item for item in message.view.children if getattr(item, 'custom_id', None) in player.pots]
+                await self.press('potion', message, button=self.rng.choice(pots))
+            elif auto or self.rng.random() < 0.2:
+                await self.press('auto_battle', message, "Auto Battle")
+            else:
+                await self.press('continue', message, "Continue")
+
+        await self.press('exit', message, "Exit")
+        if find_button(message.view, "Okay"):
+            await self.press('okay', message, "Okay")
+
+    async def profile(self):
+        interaction = await self.invoke('profile', game.profile)
+        message = interaction.original
+        if message and message.view and find_button(message.view, "Use Healing Pot"):
+            await self.press('heal', message, "Use Healing Pot")
+
+    async def shop(self):
+        interaction = await self.invoke('shop', game.shop)
+        message = interaction.original
+        if message is None or message.view is None:
+            return
+        affordable = [
+            item for item in message.view.children
+            if not item.disabled and getattr(item, 'custom_id', None) in game.GameData.POTS
+        ]
+        if affordable:
+            await self.press('purchase', message, button=self.rng.choice(affordable))
+        await self.press('shop_exit', message, "Exit")
+
+    async def run(self, deadline):
+        while time.perf_counter() < deadline:
+            await self.ensure_character()
+            action = self.rng.random()
+            try:
+                if action < 0.7:
+                    await self.combat_session()
+                elif action < 0.85:
+                    await self.profile()
+                elif action < 0.95:
+                    await self.shop()
+                else:
+                    await self.invoke('rankings', game.rankings)
+            except Exception as e:
+                self.stats.errors += 1
+                print(f"Player {self.user_id} failed: {type(e).__name__}: {e}")
+                game.SessionManager.end_session(self.user_id)
+            await self.think()
+
+async def run_load(args, repository=None, assignments=None):
+    gateway = FakeGateway(api_latency=args.api_latency)
+    stats = LoadStats()
+
+    root = tempfile.mkdtemp(prefix='loadtest-')
+    game.characters = repository or CharacterRepository(
+        JsonFileBackend(os.path.join(root, 'database.json'), os.path.join(root, 'hiscore.json')),
+        flush_interval=args.flush_interval
+    )
+    game.characters.load()
+    game.HighScoreSystem.load([])
+    game.replays.REPLAY_FILE = os.path.join(root, 'replays.jsonl')
+    game.bot = game.create_bot()
+    game.bot.fetch_user = gateway.fetch_user
+    game.combat_scheduler.tick = args.tick
+    game.edit_queue = game.MessageEditQueue(
+        edits_per_window=args.edits_per_window,
+        window=args.window,
+        max_concurrent=args.edit_concurrency
+    )
+    game.characters.start()
+
+    if assignments is None:
+        channels = [gateway.channel() for _ in range(args.channels or args.players)]
+        assignments = [(200000000000000000 + i, channels[i % len(channels)]) for i in range(args.players)]
+    else:
+        guilds = {}
+        assignments = [
+            (user_id, guilds.get(guild_id) or guilds.setdefault(guild_id, gateway.channel(guild_id=guild_id)))
+            for user_id, guild_id in assignments
+        ]
+    players = [
+        SimulatedPlayer(gateway, stats, user_id, channel, random.Random(args.seed + i), args)
+        for i, (user_id, channel) in enumerate(assignments)
+    ]
+
+    lag_task = asyncio.create_task(monitor_loop_lag(stats))
+    start = time.perf_counter()
+    deadline = start + args.duration
+    await asyncio.gather(*(player.run(deadline) for player in players))
+    elapsed = time.perf_counter() - start
+    lag_task.cancel()
+    await game.characters.stop()
+    game.characters.close()
+    report = stats.summary(elapsed, gateway)
+    report['data_dir'] = root
+    return report
+
+def print_report(players, report):
+    print(f"{players} players for {report['elapsed_s']:.1f}s: {report['fights']} fights "
+          f"({report['fights_per_s']:.1f}/s), {report['deaths']} deaths, {report['busy']} busy, {report['errors']} errors")
+    print(f"Edits: {report['edits']} ({report['edits_per_s']:.1f}/s), queue {report['edit_queue']}")
+    print(f"Loop lag: p50 {report['loop_lag_p50_ms']:.2f}ms p99 {report['loop_lag_p99_ms']:.2f}ms max {report['loop_lag_max_ms']:.2f}ms")
+    print(f"{'command':<14} {'count':>7} {'resp p50':>9} {'resp p99':>9} {'done p50':>9} {'done p99':>9}")
+    for name, row in report['commands'].items():
+        print(
+            f"{name:<14} {row['count']:>7} {row['response_p50_ms']:>9.1f} {row['response_p99_ms']:>9.1f} "
+            f"{row['complete_p50_ms']:>9.1f} {row['complete_p99_ms']:>9.1f}"
+        )
+
+def add_load_arguments(parser):
+    parser.add_argument('--players', type=int, default=200)
+    parser.add_argument('--duration', type=float, default=30.0, help="Seconds to keep starting new actions")
+    parser.add_argument('--fights', type=int, default=5, help="Fights per combat session")
+    parser.add_argument('--auto', type=float, default=0.3, help="Share of sessions started with auto=True")
+    parser.add_argument('--potions', type=float, default=0.2, help="Chance to drink a potion between fights")
+    parser.add_argument('--think', type=float, default=0.5, help="Max seconds a player waits between clicks")
+    parser.add_argument('--channels', type=int, help="Channels shared by the players (default: one each)")
+    parser.add_argument('--tick', type=float, default=0.2, help="Combat tick in seconds")
+    parser.add_argument('--api-latency', type=float, default=0.05, help="Simulated Discord API round trip")
+    parser.add_argument('--edits-per-window', type=int, default=5)
+    parser.add_argument('--window', type=float, default=5.0)
+    parser.add_argument('--edit-concurrency', type=int, default=10)
+    parser.add_argument('--flush-interval', type=float, default=5.0)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="Write the report as JSON to this path")
+
+def main():
+    parser = argparse.ArgumentParser(description="Drive simulated players through the bot's commands without Discord")
+    add_load_arguments(parser)
+    args = parser.parse_args()
+
+    report = asyncio.run(run_load(args))
+
+    print_report(args.players, report)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=4)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+import random
+
+NAMES = ['Aria', 'Bram', 'Cato', 'Dara', 'Eryn', 'Finn', 'Gale', 'Hale', 'Isla', 'Joss']
+
+def make_character(user_id, rng):
+    level = rng.randint(1, 30)
+    return {
+        'user_id': user_id,
+        'name': f"{rng.choice(NAMES)}{user_id}",
+        'atk': round(rng.randint(0, 25) + 0.6 * (level - 1), 1),
+        'def': round(rng.randint(0, 25) + 0.7 * (level - 1), 1),
+        'eva': round(rng.randint(0, 25) + 0.4 * (level - 1), 1),
+        'luk': round(rng.randint(0, 25) + 0.3 * (level - 1), 1),
+        'level': level,
+        'coins': rng.randint(0, 2000),
+        'pots': {
+            'heal_pot': rng.randint(0, 5),
+            'atk_pot': rng.randint(0, 3),
+            'def_pot': rng.randint(0, 3),
+            'dmg_pot': rng.randint(0, 2)
+        },
+        'current_hp': rng.randint(1, 100),
+        'max_hp': 100,
+        'current_exp': rng.randint(0, 99)
+    }
+
+def make_database(count, seed=0):
+    rng = random.Random(seed)
+    return {str(100000000000000000 + i): make_character(str(100000000000000000 + i), rng) for i in range(count)}
+
+def make_scores(count=10, seed=0):
+    rng = random.Random(seed)
+    return [
+        {
+            'user_id': str(100000000000000000 + i),
+            'char_name': f"{rng.choice(NAMES)}{i}",
+            'level': rng.randint(1, 40),
+            'discord_name': f"player{i}",
+            'date': '01/01/25'
+        }
+        for i in range(count)
+    ]
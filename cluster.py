@@ -0,0 +1,120 @@
+import os
+import sys
+import time
+import signal
+import socket
+import argparse
+import subprocess
+import storage
+
+def parse_shard_ids(value):
+    if not value:
+        return None
+    return [int(shard_id) for shard_id in value.split(',') if shard_id.strip()]
+
+SHARD_COUNT = int(os.getenv('SHARD_COUNT', '1'))
+SHARD_IDS = parse_shard_ids(os.getenv('SHARD_IDS'))
+CLUSTER_ID = int(os.getenv('CLUSTER_ID', '0'))
+CLUSTER_PROCESSES = int(os.getenv('CLUSTER_PROCESSES', str(os.cpu_count() or 1)))
+RESTART_DELAY = float(os.getenv('CLUSTER_RESTART_DELAY', '5'))
+
+def lease_owner():
+    if SHARD_IDS is None:
+        return None
+    return f"{socket.gethostname()}:cluster-{CLUSTER_ID}"
+
+def shard_ids_for(cluster_id, processes, shard_count):
+    return list(range(cluster_id, shard_count, processes))
+
+def shard_for_guild(guild_id, shard_count):
+    return (int(guild_id) >> 22) % shard_count
+
+def cluster_env(cluster_id, processes, shard_count, web_port=None):
+    env = dict(os.environ)
+    env['CLUSTER_ID'] = str(cluster_id)
+    env['SHARD_COUNT'] = str(shard_count)
+    env['CLUSTER_PROCESSES'] = str(processes)
+    env['SHARD_IDS'] = ",".join(str(shard_id) for shard_id in shard_ids_for(cluster_id, processes, shard_count))
+    env['WEB_PORT'] = str(web_port + cluster_id) if web_port else '0'
+    return env
+
+class ClusterLauncher:
+    def __init__(self, processes=CLUSTER_PROCESSES, shard_count=SHARD_COUNT, command=None, web_port=None, restart_delay=RESTART_DELAY):
+        self.processes = max(1, min(processes, shard_count))
+        self.shard_count = shard_count
+        self.command = command or [sys.executable, 'main.py']
+        self.web_port = web_port
+        self.restart_delay = restart_delay
+        self.children = {}
+        self.restart_at = {}
+        self.stopping = False
+
+    def spawn(self, cluster_id):
+        env = cluster_env(cluster_id, self.processes, self.shard_count, self.web_port)
+        print(f"Starting cluster {cluster_id} with shards {env['SHARD_IDS']} of {self.shard_count}")
+        self.children[cluster_id] = subprocess.Popen(self.command, env=env)
+
+    def start(self):
+        for cluster_id in range(self.processes):
+            self.spawn(cluster_id)
+
+    def poll(self):
+        now = time.monotonic()
+        for cluster_id, child in list(self.children.items()):
+            code = child.poll()
+            if code is None:
+                continue
+            del self.children[cluster_id]
+            print(f"Cluster {cluster_id} exited with code {code}")
+            if code != 0 and not self.stopping:
+                self.restart_at[cluster_id] = now + self.restart_delay
+
+        for cluster_id, when in list(self.restart_at.items()):
+            if when <= now and not self.stopping:
+                del self.restart_at[cluster_id]
+                self.spawn(cluster_id)
+
+    def stop(self, timeout=30):
+        self.stopping = True
+        self.restart_at.clear()
+        for child in self.children.values():
+            child.terminate()
+        deadline = time.monotonic() + timeout
+        for child in self.children.values():
+            try:
+                child.wait(max(0, deadline - time.monotonic()))
+            except subprocess.TimeoutExpired:
+                child.kill()
+        self.children.clear()
+
+    def run(self):
+        def shutdown(signum, frame):
+            self.stopping = True
+
+        signal.signal(signal.SIGINT, shutdown)
+        signal.signal(signal.SIGTERM, shutdown)
+        self.start()
+        try:
+            while not self.stopping and (self.children or self.restart_at):
+                self.poll()
+                time.sleep(1)
+        finally:
+            self.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the bot as several processes, each owning a slice of the gateway shards")
+    parser.add_argument('--processes', type=int, default=CLUSTER_PROCESSES)
+    parser.add_argument('--shards', type=int, default=max(SHARD_COUNT, CLUSTER_PROCESSES))
+    parser.add_argument('--web-port', type=int, default=int(os.getenv('WEB_PORT', '8080')), help="Cluster N serves health and metrics on this port + N (0 to disable)")
+    args = parser.parse_args()
+
+    backend = storage.create_backend()
+    if not getattr(backend, 'shared', False):
+        print(f"STORAGE_BACKEND={storage.STORAGE_BACKEND} cannot be shared between processes, use sqlite")
+        sys.exit(1)
+    backend.close()
+
+    ClusterLauncher(args.processes, args.shards, web_port=args.web_port).run()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,333 @@
+import random
+from bisect import bisect
+from functools import lru_cache
+from itertools import accumulate
+from gamedata import GameData
+
+EXP_PER_LEVEL = 100
+LEVEL_UP_HEAL = 40
+LEVEL_UP_STATS = {
+    'atk': 0.6,
+    'def': 0.7,
+    'eva': 0.4,
+    'luk': 0.3
+}
+LOWER_LEVEL_WEIGHT = 0.35
+SAME_LEVEL_WEIGHT = 0.4
+HIGHER_LEVEL_WEIGHT = 0.25
+
+class LootSystem:
+    @staticmethod
+    def generate_loot(player_luck=0, rng=random):
+        loot = {'pots': {}, 'coins': 0}
+
+        pot_chance = 0.2 + (player_luck * 0.008)
+        coin_chance = 0.3 + (player_luck * 0.008)
+
+        if rng.random() < pot_chance:
+            for pot, data in GameData.POTS.items():
+                modified_chance = data['chance'] + (player_luck * 0.003)
+                if rng.random() < modified_chance:
+                    loot['pots'][pot] = 1
+
+        if rng.random() < coin_chance:
+            base_coins = rng.randint(20, 50)
+            luck_bonus = int(player_luck * 0.3)
+            loot['coins'] = base_coins + luck_bonus
+
+        return loot
+
+class Monster:
+    __slots__ = ('level', 'monster_type', 'name', 'hp', 'atk', 'def_')
+
+    MONSTER_TYPES = {
+        'Slime': {
+            'base_hp': 20,
+            'base_atk': 3,
+            'base_def': 1,
+            'atk_per_level': 0.5,
+            'def_per_level': 0.3,
+            'weight': 0.35
+        },
+        'Wolf': {
+            'base_hp': 25,
+            'base_atk': 4,
+            'base_def': 2,
+            'atk_per_level': 0.7,
+            'def_per_level': 0.4,
+            'weight': 0.35
+        },
+        'Goblin': {
+            'base_hp': 30,
+            'base_atk': 5,
+            'base_def': 3,
+            'atk_per_level': 0.8,
+            'def_per_level': 0.5,
+            'weight': 0.25
+        },
+        'Orc': {
+            'base_hp': 35,
+            'base_atk': 6,
+            'base_def': 4,
+            'atk_per_level': 1.0,
+            'def_per_level': 0.6,
+            'weight': 0.05
+        }
+    }
+
+    def __init__(self, level, rng=random, monster_type=None, level_diff=0):
+        if monster_type is None:
+            monster_type = self._select_monster_type(rng)
+
+        self.level = level
+        self.monster_type = monster_type
+        self.name, self.hp, self.atk, self.def_ = stat_block(monster_type, level, level_diff)
+
+    def _select_monster_type(self, rng=random):
+        return MONSTER_TYPE_NAMES[bisect(MONSTER_TYPE_CUM_WEIGHTS, rng.random() * MONSTER_TYPE_TOTAL_WEIGHT, 0, MONSTER_TYPE_HI)]
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'level': self.level,
+            'atk': self.atk,
+            'def': self.def_,
+            'hp': self.hp
+        }
+
+MONSTER_TYPE_NAMES = tuple(Monster.MONSTER_TYPES)
+MONSTER_TYPE_CUM_WEIGHTS = tuple(accumulate(Monster.MONSTER_TYPES[t]['weight'] for t in MONSTER_TYPE_NAMES))
+MONSTER_TYPE_TOTAL_WEIGHT = MONSTER_TYPE_CUM_WEIGHTS[-1] + 0.0
+MONSTER_TYPE_HI = len(MONSTER_TYPE_NAMES) - 1
+
+def monster_stats(monster_type, level):
+    stats = Monster.MONSTER_TYPES[monster_type]
+    hp = min(100, int(stats['base_hp'] + (10 * (level - 1))))
+    atk = int(stats['base_atk'] + (stats['atk_per_level'] * (level - 1)))
+    def_ = int(stats['base_def'] + (stats['def_per_level'] * (level - 1)))
+    return hp, atk, def_
+
+def scale_to_player(hp, atk, def_, level_diff):
+    scaling_factor = 1 + (0.1 * level_diff)
+
+    if level_diff > 0:
+        atk = int(atk * 0.9)
+        def_ = int(def_ * 0.9)
+    elif level_diff < 0:
+        atk = int(atk * 1.1)
+        def_ = int(def_ * 1.1)
+
+    hp = int(min(100, hp * scaling_factor))
+    return hp, atk, def_
+
+def spawn_level_weights(player_level):
+    min_level = max(1, player_level - 2)
+    max_level = player_level + 2
+    possible_levels = list(range(min_level, max_level + 1))
+    lower = len([l for l in possible_levels if l < player_level])
+    higher = len([l for l in possible_levels if l > player_level])
+    weights = []
+
+    for level in possible_levels:
+        if level == player_level:
+            weights.append(SAME_LEVEL_WEIGHT)
+        elif level < player_level:
+            weights.append(LOWER_LEVEL_WEIGHT / lower)
+        else:
+            weights.append(HIGHER_LEVEL_WEIGHT / higher)
+
+    return possible_levels, weights
+
+@lru_cache(maxsize=None)
+def spawn_table(player_level):
+    possible_levels, weights = spawn_level_weights(player_level)
+    cum_weights = tuple(accumulate(weights))
+    return tuple(possible_levels), cum_weights, cum_weights[-1] + 0.0, len(possible_levels) - 1
+
+@lru_cache(maxsize=None)
+def stat_block(monster_type, level, level_diff=0):
+    hp, atk, def_ = scale_to_player(*monster_stats(monster_type, level), level_diff)
+    return f"Lv.{level} {monster_type}", hp, atk, def_
+
+def generate_monster(player_level, rng=random):
+    levels, cum_weights, total, hi = spawn_table(player_level)
+    monster_level = levels[bisect(cum_weights, rng.random() * total, 0, hi)]
+    monster_type = MONSTER_TYPE_NAMES[bisect(MONSTER_TYPE_CUM_WEIGHTS, rng.random() * MONSTER_TYPE_TOTAL_WEIGHT, 0, MONSTER_TYPE_HI)]
+    return Monster(monster_level, monster_type=monster_type, level_diff=monster_level - player_level)
+
+def apply_opening_effects(monster, effects, rng=random, log=None):
+    if 'damage' not in effects:
+        return 0
+
+    damage = rng.randint(*GameData.POTS['dmg_pot']['value'])
+    monster.hp -= damage
+    if log is not None:
+        log.append(f"💥 Damage potion dealt {damage} damage!")
+    del effects['damage']
+    return damage
+
+def effective_stats(player, effects):
+    total_atk = player.atk
+    total_def = player.def_
+
+    for effect, data in effects.items():
+        if effect == 'attack':
+            total_atk += data['value']
+        elif effect == 'defense':
+            total_def += data['value']
+
+    return total_atk, total_def
+
+def player_attack(player, monster, total_atk, rng=random, log=None):
+    base_damage = total_atk - (monster.def_ * 0.5)
+    damage_roll = rng.uniform(0.8, 1.2)
+    damage_to_monster = max(1, int(base_damage * damage_roll))
+
+    crit_chance = min(0.25, player.luk * 0.01)
+    if rng.random() < crit_chance:
+        damage_to_monster = int(damage_to_monster * 1.5)
+        if log is not None:
+            log.append(f"💥 CRITICAL HIT! You deal {damage_to_monster} damage!")
+    elif log is not None:
+        log.append(f"🗡️ You deal {damage_to_monster} damage!")
+
+    monster.hp = max(0, monster.hp - damage_to_monster)
+    return damage_to_monster
+
+def monster_attack(player, monster, total_def, rng=random, log=None):
+    base_monster_damage = monster.atk - (total_def * 0.5)
+    monster_damage_roll = rng.uniform(0.8, 1.2)
+    damage_to_player = max(1, int(base_monster_damage * monster_damage_roll))
+
+    if rng.random() > (1 - min(0.75, player.eva * 0.015)):
+        if log is not None:
+            log.append("✨ You evaded the attack!")
+        return 0
+
+    if rng.random() < 0.10:
+        damage_to_player = int(damage_to_player * 1.5)
+        if log is not None:
+            log.append(f"💥 CRITICAL HIT! Monster deals {damage_to_player} damage!")
+    elif log is not None:
+        log.append(f"☠️ Monster deals {damage_to_player} damage!")
+
+    player.current_hp = max(0, player.current_hp - damage_to_player)
+    return damage_to_player
+
+def fight_outcome(player, monster):
+    if player.current_hp <= 0:
+        return 'defeat'
+    if monster.hp <= 0:
+        return 'victory'
+    return None
+
+def resolve_round(player, monster, effects, rng=random, log=None):
+    total_atk, total_def = effective_stats(player, effects)
+    damage_dealt = player_attack(player, monster, total_atk, rng, log)
+    damage_taken = 0
+    if monster.hp > 0:
+        damage_taken = monster_attack(player, monster, total_def, rng, log)
+
+    if monster.hp <= 0:
+        effects.clear()
+
+    return damage_dealt, damage_taken
+
+def calculate_exp_gain(player_level, monster_level):
+    level_diff = monster_level - player_level
+    base_exp = 10
+
+    if level_diff > 0:
+        exp_gain = base_exp * (1 + (level_diff * 0.5))
+    elif level_diff < 0:
+        exp_gain = max(1, base_exp * (1 + (level_diff * 0.3)))
+    else:
+        exp_gain = base_exp
+
+    exp_gain *= (1 + (player_level * 0.1))
+
+    return int(exp_gain)
+
+def apply_level_up(player):
+    player.level += 1
+    player.current_exp = 0
+
+    for stat, increase in LEVEL_UP_STATS.items():
+        player.set_stat(stat, round(player.stat(stat) + increase, 1))
+
+    player.current_hp = min(player.max_hp, player.current_hp + LEVEL_UP_HEAL)
+
+def apply_loot(player, loot):
+    player.coins += loot['coins']
+
+    for pot, amount in loot['pots'].items():
+        if pot not in player.pots:
+            player.pots[pot] = 0
+        player.pots[pot] += amount
+
+def apply_potion(player, effects, pot_name, log=None):
+    if player.pots.get(pot_name, 0) <= 0:
+        return False
+
+    pot_data = GameData.POTS.get(pot_name) or GameData.SPECIAL_POTS.get(pot_name)
+    if not pot_data:
+        return False
+
+    player.pots[pot_name] -= 1
+
+    if pot_data['effect'] == 'heal':
+        old_hp = player.current_hp
+        player.current_hp = min(player.max_hp, old_hp + pot_data['value'])
+        if log is not None:
+            log.append(f"💚 Healed for {player.current_hp - old_hp} HP!")
+    elif pot_data['effect'] in ['attack', 'defense']:
+        effects[pot_data['effect']] = {'value': pot_data['value']}
+        if log is not None:
+            log.append(f"✨ {pot_data['effect'].title()} buff activated!")
+    elif pot_data['effect'] == 'damage':
+        effects['damage'] = {'value': pot_data['value']}
+        if log is not None:
+            log.append("💥 Preparing to use damage potion...")
+
+    return True
+
+def resolve_victory(player, monster, rng=random):
+    exp_gained = calculate_exp_gain(player.level, monster.level)
+    player.current_exp += exp_gained
+
+    initial_stats = None
+    if player.current_exp >= EXP_PER_LEVEL:
+        initial_stats = player.stats()
+        apply_level_up(player)
+
+    loot = LootSystem.generate_loot(player.luk, rng)
+    apply_loot(player, loot)
+
+    return {
+        'exp_gained': exp_gained,
+        'initial_stats': initial_stats,
+        'loot': loot
+    }
+
+def resolve_fight(player, monster, effects, rng=random, log=None, max_rounds=1000):
+    apply_opening_effects(monster, effects, rng, log)
+
+    rounds = 0
+    damage_dealt = 0
+    damage_taken = 0
+    while fight_outcome(player, monster) is None and rounds < max_rounds:
+        dealt, taken = resolve_round(player, monster, effects, rng, log)
+        damage_dealt += dealt
+        damage_taken += taken
+        rounds += 1
+
+    outcome = fight_outcome(player, monster)
+    result = {
+        'outcome': outcome,
+        'rounds': rounds,
+        'damage_dealt': damage_dealt,
+        'damage_taken': damage_taken
+    }
+    if outcome == 'victory':
+        result.update(resolve_victory(player, monster, rng))
+    return result
@@ -0,0 +1,46 @@
+class GameData:
+    POTS = {
+        'heal_pot': {
+            'effect': 'heal',
+            'value': 10,
+            'chance': 0.5,
+            'description': '💚 Heals 10 HP',
+            'price': 50
+        },
+        'atk_pot': {
+            'effect': 'attack',
+            'value': 3,
+            'chance': 0.6,
+            'description': '⚔️ +3 ATK for next combat',
+            'price': 60
+        },
+        'def_pot': {
+            'effect': 'defense',
+            'value': 3,
+            'chance': 0.6,
+            'description': '🛡️ +3 DEF for next combat',
+            'price': 60
+        },
+        'dmg_pot': {
+            'effect': 'damage',
+            'value': [10, 20],
+            'chance': 0.3,
+            'description': '💥 10-20 damage to enemy',
+            'price': 80
+        }
+    }
+    
+    SPECIAL_POTS = {
+        'exp_pot': {
+            'effect': 'exp',
+            'value': 50,
+            'description': '📊 Grants 50 EXP',
+            'price': 250
+        },
+        'hp_pot_plus': {
+            'effect': 'heal',
+            'value': 50,
+            'description': '💚 Heals 50 HP',
+            'price': 100
+        }
+    }
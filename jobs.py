@@ -0,0 +1,190 @@
+import os
+import heapq
+import random
+import asyncio
+import multiprocessing
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import metrics
+import storage
+import cluster
+import combat_engine
+from models import Character
+
+def default_workers():
+    processes = cluster.CLUSTER_PROCESSES if cluster.SHARD_IDS is not None else 1
+    return max(1, ((os.cpu_count() or 2) - 1) // processes)
+
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', str(default_workers())))
+JOB_TIMEOUT = float(os.getenv('JOB_TIMEOUT', '300'))
+SIMULATION_CHUNK = 5000
+
+JOB_SECONDS = metrics.Histogram(
+    'roguelike_job_seconds', "Wall time of background jobs run in the process pool", ('job',),
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+)
+JOBS = metrics.Counter('roguelike_jobs_total', "Background jobs finished, by outcome", ('job', 'outcome'))
+
+class JobRunner:
+    def __init__(self, workers=JOB_WORKERS, timeout=JOB_TIMEOUT):
+        self.workers = workers
+        self.timeout = timeout
+        self.running = 0
+        self._pool = None
+
+    def _executor(self):
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'))
+        return self._pool
+
+    def _retire(self, pool):
+        if self._pool is pool:
+            self._pool = None
+        for process in list((pool._processes or {}).values()):
+            process.terminate()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    async def run(self, name, func, *args):
+        loop = asyncio.get_running_loop()
+        pool = self._executor()
+        self.running += 1
+        outcome = 'error'
+        try:
+            with JOB_SECONDS.time(name):
+                result = await asyncio.wait_for(loop.run_in_executor(pool, func, *args), self.timeout)
+            outcome = 'ok'
+            return result
+        except asyncio.TimeoutError:
+            outcome = 'timeout'
+            self._retire(pool)
+            raise
+        except BrokenProcessPool:
+            if self._pool is pool:
+                self._pool = None
+            raise
+        finally:
+            self.running -= 1
+            JOBS.inc(name, outcome)
+
+    async def map(self, name, func, arg_lists):
+        return await asyncio.gather(*(self.run(name, func, *args) for args in arg_lists))
+
+    def status(self):
+        return {'workers': self.workers, 'running': self.running, 'started': self._pool is not None}
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+runner = JobRunner()
+
+JOBS_RUNNING = metrics.Gauge('roguelike_jobs_running', "Background jobs currently running or queued", callback=lambda: runner.running)
+
+def resolve_fights(player_data, fights, seed):
+    rng = random.Random(seed)
+    base = Character.from_dict(player_data)
+    totals = {'fights': fights, 'wins': 0, 'rounds': 0, 'damage_taken': 0, 'exp': 0, 'coins': 0}
+
+    for _ in range(fights):
+        player = base.copy()
+        monster = combat_engine.generate_monster(player.level, rng)
+        result = combat_engine.resolve_fight(player, monster, {}, rng)
+        totals['rounds'] += result['rounds']
+        totals['damage_taken'] += result['damage_taken']
+        if result['outcome'] == 'victory':
+            totals['wins'] += 1
+            totals['exp'] += result['exp_gained']
+            totals['coins'] += result['loot']['coins']
+
+    return totals
+
+def summarize_fights(chunks):
+    totals = Counter()
+    for chunk in chunks:
+        totals.update(chunk)
+
+    fights = totals['fights'] or 1
+    return {
+        'fights': totals['fights'],
+        'win_rate': totals['wins'] / fights,
+        'avg_rounds': totals['rounds'] / fights,
+        'avg_damage_taken': totals['damage_taken'] / fights,
+        'avg_exp': totals['exp'] / fights,
+        'avg_coins': totals['coins'] / fights
+    }
+
+async def simulate_fights(player, fights, seed=None):
+    seed = random.SystemRandom().getrandbits(32) if seed is None else seed
+    data = player.to_dict()
+    chunks = [
+        (data, min(SIMULATION_CHUNK, fights - start), seed + index)
+        for index, start in enumerate(range(0, fights, SIMULATION_CHUNK))
+    ]
+    return summarize_fights(await runner.map('simulate', resolve_fights, chunks))
+
+def rank_characters(spec, limit):
+    backend = storage.open_backend(spec)
+    try:
+        records = backend.load()
+    finally:
+        if hasattr(backend, 'close'):
+            backend.close()
+
+    characters = []
+    for data in records.values():
+        try:
+            characters.append(Character.from_dict(data))
+        except ValueError:
+            continue
+
+    top = heapq.nlargest(limit, characters, key=lambda char: (char.level, char.current_exp))
+    return {
+        'total': len(characters),
+        'levels': dict(sorted(Counter(char.level for char in characters).items())),
+        'top': [
+            {'user_id': char.user_id, 'name': char.name, 'level': char.level, 'current_exp': char.current_exp}
+            for char in top
+        ]
+    }
+
+async def recompute_leaderboard(repository, limit=storage.HISCORE_LIMIT):
+    return await runner.run('leaderboard', rank_characters, repository.backend.reader_spec(), limit)
+
+def compact_backend(spec):
+    backend = storage.open_backend(spec)
+    if isinstance(backend, storage.JournalBackend):
+        backend.load()
+        backend.compact()
+        return True
+    if isinstance(backend, storage.SqliteBackend):
+        try:
+            backend.vacuum()
+        finally:
+            backend.close()
+        return True
+    return False
+
+async def compact_store(repository):
+    await repository.flush_async()
+    async with repository.exclusive():
+        compacted = await runner.run('compact', compact_backend, repository.backend.reader_spec())
+        if compacted and hasattr(repository.backend, 'compacted'):
+            repository.backend.compacted()
+    return compacted
+
+def balance_cell(level, monster_type, fights, seed):
+    try:
+        import simulator
+    except ImportError as e:
+        raise RuntimeError(str(e)) from None
+    return simulator.simulate_cell(level, monster_type, fights, seed)
+
+async def balance_table(levels, fights, seed=0):
+    cells = [
+        (level, monster_type, fights, seed + level * 100 + index)
+        for level in levels
+        for index, monster_type in enumerate(combat_engine.Monster.MONSTER_TYPES)
+    ]
+    return await runner.map('balance', balance_cell, cells)
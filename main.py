@@ -2,198 +2,155 @@ import discord
 from dotenv import load_dotenv
 import os
 import json
-import random
+import time
 import asyncio
+import signal
+import heapq
+import random
 from datetime import datetime
 from discord.ext import commands
-
-DBFILE = 'database.json'
-
-intents = discord.Intents.default()
-intents.messages = True
-intents.message_content = True
-bot = commands.Bot(command_prefix='/', intents=intents)
+from storage import CharacterRepository, HISCORE_LIMIT
+from models import Character, STATS, format_stat
+from gamedata import GameData
+import combat_engine
+import replays
+import cluster
+import jobs
+import metrics
+from profiling import profiler
+from webserver import WebServer
+
+load_dotenv()
+
+bot = None
+characters = None
+web_server = None
+
+SESSION_TTL = float(os.getenv('SESSION_TTL', '600'))
+SESSION_REAP_INTERVAL = float(os.getenv('SESSION_REAP_INTERVAL', '60'))
+BUSY_MESSAGE = "Your character is busy in another server. Finish that session first!"
+
+class Session:
+    __slots__ = ('user_id', 'type', 'owner', 'started_at', 'last_activity')
+
+    def __init__(self, user_id, session_type):
+        self.user_id = user_id
+        self.type = session_type
+        self.owner = None
+        self.started_at = time.monotonic()
+        self.last_activity = self.started_at
 
 class SessionManager:
     active_sessions = {}
+    _reaper_task = None
 
     @classmethod
     def start_session(cls, user_id: str, session_type: str) -> bool:
         if user_id in cls.active_sessions:
             return False
-        cls.active_sessions[user_id] = session_type
+        cls.active_sessions[user_id] = Session(user_id, session_type)
         return True
 
+    @classmethod
+    def attach(cls, user_id: str, owner):
+        session = cls.active_sessions.get(user_id)
+        if session is not None:
+            session.owner = owner
+
+    @classmethod
+    def touch(cls, user_id: str, owner=None):
+        session = cls.active_sessions.get(user_id)
+        if session is None or (owner is not None and session.owner is not owner):
+            return
+        session.last_activity = time.monotonic()
+        cls.active_sessions[user_id] = cls.active_sessions.pop(user_id)
+
     @classmethod
     def end_session(cls, user_id: str):
         if user_id in cls.active_sessions:
             del cls.active_sessions[user_id]
+        characters.release(user_id)
 
     @classmethod
-    def get_session(cls, user_id: str) -> str:
-        return cls.active_sessions.get(user_id)
-
-class GameData:
-    POTS = {
-        'heal_pot': {
-            'effect': 'heal',
-            'value': 10,
-            'chance': 0.5,
-            'description': '💚 Heals 10 HP',
-            'price': 50
-        },
-        'atk_pot': {
-            'effect': 'attack',
-            'value': 3,
-            'chance': 0.6,
-            'description': '⚔️ +3 ATK for next combat',
-            'price': 60
-        },
-        'def_pot': {
-            'effect': 'defense',
-            'value': 3,
-            'chance': 0.6,
-            'description': '🛡️ +3 DEF for next combat',
-            'price': 60
-        },
-        'dmg_pot': {
-            'effect': 'damage',
-            'value': [10, 20],
-            'chance': 0.3,
-            'description': '💥 10-20 damage to enemy',
-            'price': 80
-        }
-    }
-    
-    SPECIAL_POTS = {
-        'exp_pot': {
-            'effect': 'exp',
-            'value': 50,
-            'description': '📊 Grants 50 EXP',
-            'price': 250
-        },
-        'hp_pot_plus': {
-            'effect': 'heal',
-            'value': 50,
-            'description': '💚 Heals 50 HP',
-            'price': 100
-        }
-    }
-
-class LootSystem:
-    @staticmethod
-    def generate_loot(player_luck=0):
-        loot = {'pots': {}, 'coins': 0}
-        
-        pot_chance = 0.2 + (player_luck * 0.008) 
-        coin_chance = 0.3 + (player_luck * 0.008)
-        
-        if random.random() < pot_chance:
-            for pot, data in GameData.POTS.items():
-                modified_chance = data['chance'] + (player_luck * 0.003)
-                if random.random() < modified_chance:
-                    loot['pots'][pot] = 1
-
-        if random.random() < coin_chance:
-            base_coins = random.randint(20, 50)
-            luck_bonus = int(player_luck * 0.3)
-            loot['coins'] = base_coins + luck_bonus
-            
-        return loot
-
-class Utils:
-    @staticmethod
-    def user_has_character(user_id):
-        try:
-            with open(DBFILE, 'r') as f:
-                data = f.read()
-                if not data:
-                    data = {}
-                else:
-                    data = json.loads(data)
-        except FileNotFoundError:
-            return False
+    async def claim(cls, user_id: str) -> bool:
+        return await characters.acquire(user_id)
 
-        return user_id in data
+    @classmethod
+    def release(cls, user_id: str):
+        if user_id not in cls.active_sessions:
+            characters.release(user_id)
 
-    @staticmethod
-    def character_name_exists(name):
-        try:
-            with open(DBFILE, 'r') as f:
-                data = f.read()
-                if not data:
-                    data = {}
-                else:
-                    data = json.loads(data)
-        except FileNotFoundError:
-            return False
+    @classmethod
+    def get_session(cls, user_id: str) -> str:
+        session = cls.active_sessions.get(user_id)
+        return session.type if session else None
 
-        for char_data in data.values():
-            if char_data['name'].lower() == name.lower():
-                return True
+    @classmethod
+    def session_counts(cls):
+        counts = {('combat',): 0, ('shop',): 0}
+        for session in list(cls.active_sessions.values()):
+            counts[(session.type,)] = counts.get((session.type,), 0) + 1
+        return counts
 
-        return False
+    @classmethod
+    async def reap(cls, now=None):
+        now = time.monotonic() if now is None else now
+        expired = []
+        for session in cls.active_sessions.values():
+            if now - session.last_activity < SESSION_TTL:
+                break
+            expired.append(session)
+
+        for session in expired:
+            if cls.active_sessions.get(session.user_id) is not session or now - session.last_activity < SESSION_TTL:
+                continue
+            del cls.active_sessions[session.user_id]
+            if session.owner is not None:
+                try:
+                    await session.owner.expire()
+                except Exception as e:
+                    print(f"Error expiring {session.type} session for {session.user_id}: {e}")
+            cls.release(session.user_id)
+        return len(expired)
 
-class CharCreate:
-    def __init__(self, user_id, name, atk, def_, eva, luk, level=1, coins=0, pots=None, current_hp=100, max_hp=100, current_exp=0):
-        if pots is None:
-            pots = {}
-        self.user_id = user_id
-        self.name = name
-        self.atk = float(atk) if float(atk) % 1 != 0 else int(atk)
-        self.def_ = float(def_) if float(def_) % 1 != 0 else int(def_)
-        self.eva = float(eva) if float(eva) % 1 != 0 else int(eva)
-        self.luk = float(luk) if float(luk) % 1 != 0 else int(luk)
-        self.level = level
-        self.coins = coins
-        self.pots = pots
-        self.current_hp = current_hp
-        self.max_hp = max_hp
-        self.current_exp = current_exp
-
-    def to_dict(self):
-        return {
-            'user_id': self.user_id,
-            'name': self.name,
-            'atk': self.atk,
-            'def': self.def_,
-            'eva': self.eva,
-            'luk': self.luk,
-            'level': self.level,
-            'coins': self.coins,
-            'pots': self.pots,
-            'current_hp': self.current_hp,
-            'max_hp': self.max_hp,
-            'current_exp': self.current_exp
-        }
+    @classmethod
+    async def _reap_loop(cls):
+        while True:
+            await asyncio.sleep(SESSION_REAP_INTERVAL)
+            await cls.reap()
 
-    def save_to_db(self):
-        try:
-            with open(DBFILE, 'r') as f:
-                data = f.read()
-                if data:
-                    data = json.loads(data)
-                else:
-                    data = {}
-        except FileNotFoundError:
-            data = {}
+    @classmethod
+    def start_reaper(cls):
+        if cls._reaper_task is None or cls._reaper_task.done():
+            cls._reaper_task = asyncio.get_running_loop().create_task(cls._reap_loop())
 
-        data[self.user_id] = self.to_dict()
+class Utils:
+    @staticmethod
+    def user_has_character(user_id):
+        return characters.exists(user_id)
 
-        with open(DBFILE, 'w') as f:
-            json.dump(data, f, indent=4)
+    @staticmethod
+    async def character_name_exists(name):
+        return await characters.name_in_use(name)
 
-    def level_up(self):
-        self.level += 1
-        self.atk = round(self.atk + 0.6, 1)
-        self.def_ = round(self.def_ + 0.5, 1)
-        self.eva = round(self.eva + 0.7, 1)
-        self.luk = round(self.luk + 0.5, 1)
-        
-        self.atk = int(self.atk) if self.atk % 1 == 0 else self.atk
-        self.def_ = int(self.def_) if self.def_ % 1 == 0 else self.def_
-        self.eva = int(self.eva) if self.eva % 1 == 0 else self.eva
-        self.luk = int(self.luk) if self.luk % 1 == 0 else self.luk
+    @staticmethod
+    def create_profile_embed(char_data, avatar_url):
+        embed = discord.Embed(title=f"{char_data.name}'s Profile", color=discord.Color.blue())
+        embed.add_field(name="Level", value=char_data.level, inline=True)
+        embed.add_field(name="HP", value=f"{char_data.current_hp}/{char_data.max_hp}", inline=True)
+        embed.add_field(name="EXP", value=char_data.current_exp, inline=True)
+        embed.add_field(name="Attack", value=format_stat(char_data.atk), inline=True)
+        embed.add_field(name="Defense", value=format_stat(char_data.def_), inline=True)
+        embed.add_field(name="Evasion", value=format_stat(char_data.eva), inline=True)
+        embed.add_field(name="Luck", value=format_stat(char_data.luk), inline=True)
+        embed.add_field(name="Coins", value=char_data.coins, inline=True)
+        
+        pots = "\n".join([f"{pot}: {quantity}" for pot, quantity in char_data.pots.items()])
+        embed.add_field(name="Potions", value=pots if pots else "None", inline=False)
+
+        embed.set_thumbnail(url=avatar_url)
+        embed.set_footer(text="Character Profile")
+        return embed
 
 class CharacterCreateModal(discord.ui.Modal, title="Create Your Character"):
     req1 = "Total stat points cannot exceed 25."
@@ -218,353 +175,702 @@ class CharacterCreateModal(discord.ui.Modal, title="Create Your Character"):
             await interaction.response.send_message("Total stat points cannot exceed 25.", ephemeral=True)
             return
 
-        char = CharCreate(
-            user_id=str(interaction.user.id),
-            name=self.name.value,
-            atk=atk,
-            def_=def_,
-            eva=eva,
-            luk=luk,
-            coins=0,
-            pots={}
-        )
-        char.save_to_db()
+        user_id = str(interaction.user.id)
+        if not await SessionManager.claim(user_id):
+            await interaction.response.send_message(BUSY_MESSAGE, ephemeral=True)
+            return
+
+        try:
+            if await Utils.character_name_exists(self.name.value):
+                await interaction.response.send_message("A character with that name already exists.", ephemeral=True)
+                return
+
+            char = Character(
+                user_id=user_id,
+                name=self.name.value,
+                atk=atk,
+                def_=def_,
+                eva=eva,
+                luk=luk,
+                coins=0,
+                pots={}
+            )
+            characters.save(char, reason='create')
+        finally:
+            SessionManager.release(user_id)
         await interaction.response.send_message(f"Character {self.name.value} created successfully!", ephemeral=True)
 
-class Monster:
-    MONSTER_TYPES = {
-        'Slime': {
-            'base_hp': 20,
-            'base_atk': 3,
-            'base_def': 1,
-            'atk_per_level': 0.5,
-            'def_per_level': 0.3,
-            'weight': 0.35
-        },
-        'Wolf': {
-            'base_hp': 25,
-            'base_atk': 4,
-            'base_def': 2,
-            'atk_per_level': 0.7,
-            'def_per_level': 0.4,
-            'weight': 0.35
-        },
-        'Goblin': {
-            'base_hp': 30,
-            'base_atk': 5,
-            'base_def': 3,
-            'atk_per_level': 0.8,
-            'def_per_level': 0.5,
-            'weight': 0.25
-        },
-        'Orc': {
-            'base_hp': 35,
-            'base_atk': 6,
-            'base_def': 4,
-            'atk_per_level': 1.0,
-            'def_per_level': 0.6,
-            'weight': 0.05
-        }
-    }
+class HighScoreSystem:
+    LIMIT = HISCORE_LIMIT
+    REFRESH_INTERVAL = 30
+    _heap = None
+    _sequence = 0
+    _loaded_at = 0.0
+    _rankings = None
+    _rankings_embed = None
 
-    def __init__(self, level):
-        self.level = level
-        monster_type = self._select_monster_type()
-        stats = self.MONSTER_TYPES[monster_type]
-        
-        self.name = f"Lv.{level} {monster_type}"
-        self.hp = min(100, int(stats['base_hp'] + (10 * (level - 1))))
-        self.atk = int(stats['base_atk'] + (stats['atk_per_level'] * (level - 1)))
-        self.def_ = int(stats['base_def'] + (stats['def_per_level'] * (level - 1)))
-
-    def _select_monster_type(self):
-        types = list(self.MONSTER_TYPES.keys())
-        weights = [self.MONSTER_TYPES[t]['weight'] for t in types]
-        return random.choices(types, weights=weights)[0]
-
-    def to_dict(self):
-        return {
-            'name': self.name,
-            'level': self.level,
-            'atk': self.atk,
-            'def': self.def_,
-            'hp': self.hp
-        }
+    @classmethod
+    def load(cls, scores):
+        cls._heap = []
+        cls._sequence = 0
+        cls._loaded_at = time.monotonic()
+        for score in scores:
+            cls._push(score)
+        cls._invalidate()
 
-class HighScoreSystem:
-    HISCORE_FILE = 'hiscore.json'
+    @classmethod
+    async def refresh(cls):
+        if not characters.shared or time.monotonic() - cls._loaded_at < cls.REFRESH_INTERVAL:
+            return
+        cls.load(await characters.load_scores_async(cls.LIMIT))
+
+    @classmethod
+    def _board(cls):
+        if cls._heap is None:
+            cls.load(characters.load_scores(cls.LIMIT))
+        return cls._heap
+
+    @classmethod
+    def _push(cls, score):
+        cls._sequence += 1
+        item = (score['level'], -cls._sequence, score)
+        if len(cls._heap) < cls.LIMIT:
+            heapq.heappush(cls._heap, item)
+        else:
+            heapq.heapreplace(cls._heap, item)
+
+    @classmethod
+    def _invalidate(cls):
+        cls._rankings = None
+        cls._rankings_embed = None
+
+    @classmethod
+    def qualifies(cls, level):
+        board = cls._board()
+        return len(board) < cls.LIMIT or level > board[0][0]
 
     @classmethod
     def record_score(cls, user_id, char_name, level, discord_user):
-        try:
-            with open(cls.HISCORE_FILE, 'r') as f:
-                scores = json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
-            scores = []
+        if not cls.qualifies(level):
+            return None
 
         discord_name = discord_user.display_name if hasattr(discord_user, 'display_name') else str(discord_user)
 
-        scores.append({
+        score = {
             'user_id': user_id,
             'char_name': char_name,
             'level': level,
             'discord_name': discord_name,
             'date': datetime.now().strftime('%m/%d/%y')
-        })
+        }
+        cls._push(score)
+        cls._invalidate()
+        return score
+
+    @classmethod
+    def get_rankings(cls):
+        if cls._rankings is None:
+            cls._rankings = [score for _, _, score in sorted(cls._board(), reverse=True)]
+        return cls._rankings
+
+    @classmethod
+    def get_rankings_embed(cls):
+        if cls._rankings_embed is not None:
+            return cls._rankings_embed
+
+        scores = cls.get_rankings()
+        
+        embed = discord.Embed(
+            title="🏆 Hall of Champions 🏆",
+            description="The greatest warriors who have fallen in battle",
+            color=discord.Color.gold()
+        )
+        
+        separator = "═══════════════════════"
+        
+        if not scores:
+            embed.add_field(name="No Records", value="Be the first to join the ranks!", inline=False)
+        else:
+            medals = ["🥇", "🥈", "🥉"]
+            
+            for i, score in enumerate(scores, 1):
+                medal = medals[i-1] if i <= 3 else "🌟"
+                field_name = f"{medal} Rank #{i}"
+                field_value = (
+                    f"**{score['discord_name']}**\n"
+                    f"Character: `{score['char_name']}`\n"
+                    f"Level: `{score['level']}`\n"
+                    f"Date: `{score['date']}`\n"
+                    f"{separator}"
+                )
+                embed.add_field(name=field_name, value=field_value, inline=False)
 
-        scores.sort(key=lambda x: x['level'], reverse=True)
-        scores = scores[:10]
+        embed.set_footer(text="May their legends live forever")
+        cls._rankings_embed = embed
+        return embed
 
-        with open(cls.HISCORE_FILE, 'w') as f:
-            json.dump(scores, f, indent=4)
+class LivingLeaderboard:
+    REFRESH_INTERVAL = float(os.getenv('LEADERBOARD_REFRESH_INTERVAL', '60'))
+    _board = None
+    _loaded_at = 0.0
+    _lock = None
 
     @classmethod
-    def get_rankings(cls):
+    async def get(cls):
+        if cls._lock is None:
+            cls._lock = asyncio.Lock()
+        async with cls._lock:
+            if cls._board is None or time.monotonic() - cls._loaded_at >= cls.REFRESH_INTERVAL:
+                await characters.flush_async()
+                cls._board = await jobs.recompute_leaderboard(characters, HISCORE_LIMIT)
+                cls._loaded_at = time.monotonic()
+        return cls._board
+
+    @staticmethod
+    def create_embed(board):
+        embed = discord.Embed(
+            title="⚔️ Living Legends ⚔️",
+            description=f"The strongest of {board['total']} adventurers still standing",
+            color=discord.Color.green()
+        )
+
+        if not board['top']:
+            embed.add_field(name="No Adventurers", value="Create a character to claim the top spot!", inline=False)
+        else:
+            lines = [
+                f"**#{i}** `{entry['name']}` - Level `{entry['level']}` ({entry['current_exp']}/{combat_engine.EXP_PER_LEVEL} EXP)"
+                for i, entry in enumerate(board['top'], 1)
+            ]
+            embed.add_field(name="Rankings", value="\n".join(lines), inline=False)
+
+        levels = ", ".join(f"Lv.{level}: {count}" for level, count in board['levels'].items())
+        if levels:
+            embed.add_field(name="Level Spread", value=levels[:1024], inline=False)
+        embed.set_footer(text="Updated every minute")
+        return embed
+
+class MessageEditQueue:
+    def __init__(self, edits_per_window=5, window=5.0, max_concurrent=10, max_tracked=10000):
+        self.edits_per_window = edits_per_window
+        self.window = window
+        self.max_tracked = max_tracked
+        self.pending = {}
+        self.channels = {}
+        self.buckets = {}
+        self.last_sent = {}
+        self.sent = 0
+        self.dropped_frames = 0
+        self.skipped_duplicates = 0
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._workers = {}
+        self._swept_at = 0.0
+
+    @property
+    def depth(self):
+        return len(self.pending)
+
+    @staticmethod
+    def fingerprint(embed, view, key=None):
+        if key is None:
+            key = json.dumps(embed.to_dict(), sort_keys=True)
+        return key, id(view) if view is not None else None
+
+    def submit(self, message, embed, view=None, fingerprint=None):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        fingerprint = self.fingerprint(embed, view, fingerprint)
+
+        previous = self.pending.pop(message.id, None)
+        if previous is not None:
+            self.dropped_frames += 1
+            EDIT_FRAMES_DROPPED.inc()
+            previous[3].set_result(False)
+        elif view is None and self.last_sent.get(message.id) == fingerprint:
+            self.skipped_duplicates += 1
+            EDIT_DUPLICATES_SKIPPED.inc()
+            future.set_result(True)
+            return future
+
+        channel_id = message.channel.id
+        self.pending[message.id] = (message, embed, view, future, fingerprint)
+        self.channels.setdefault(channel_id, {})[message.id] = None
+
+        worker = self._workers.get(channel_id)
+        if worker is None or worker.done():
+            self._sweep_buckets()
+            self._workers[channel_id] = loop.create_task(self._drain(channel_id))
+        return future
+
+    def _sweep_buckets(self):
+        now = time.monotonic()
+        if now - self._swept_at < self.window:
+            return
+        self._swept_at = now
+        for channel_id, bucket in list(self.buckets.items()):
+            if channel_id not in self._workers and (not bucket or now - bucket[-1] >= self.window):
+                del self.buckets[channel_id]
+
+    def discard(self, message):
+        entry = self.pending.pop(message.id, None)
+        if entry is not None:
+            self.dropped_frames += 1
+            EDIT_FRAMES_DROPPED.inc()
+            entry[3].set_result(False)
+        self.last_sent.pop(message.id, None)
+
+    async def _wait_for_slot(self, channel_id):
+        bucket = self.buckets.setdefault(channel_id, [])
+        now = time.monotonic()
+        bucket[:] = [sent_at for sent_at in bucket if now - sent_at < self.window]
+        if len(bucket) >= self.edits_per_window:
+            await asyncio.sleep(self.window - (now - bucket[0]))
+        bucket.append(time.monotonic())
+
+    async def _drain(self, channel_id):
+        queue = self.channels[channel_id]
         try:
-            with open(cls.HISCORE_FILE, 'r') as f:
-                return json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
-            return []
+            while queue:
+                await self._wait_for_slot(channel_id)
+                while queue:
+                    message_id = next(iter(queue))
+                    del queue[message_id]
+                    entry = self.pending.pop(message_id, None)
+                    if entry is not None:
+                        break
+                else:
+                    break
+
+                message, embed, view, future, fingerprint = entry
+                async with self._semaphore:
+                    try:
+                        await message.edit(embed=embed, view=view)
+                    except discord.NotFound:
+                        self.last_sent.pop(message_id, None)
+                        future.set_result(False)
+                        continue
+                    except discord.HTTPException as e:
+                        print(f"Error editing message: {e}")
+                        future.set_result(False)
+                        continue
+
+                self.sent += 1
+                self._remember(message_id, fingerprint)
+                future.set_result(True)
+        finally:
+            if not queue:
+                self.channels.pop(channel_id, None)
+            if self._workers.get(channel_id) is asyncio.current_task():
+                del self._workers[channel_id]
+            bucket = self.buckets.get(channel_id)
+            if bucket is not None:
+                now = time.monotonic()
+                bucket[:] = [sent_at for sent_at in bucket if now - sent_at < self.window]
+                if not bucket:
+                    del self.buckets[channel_id]
+
+    def _remember(self, message_id, fingerprint):
+        self.last_sent.pop(message_id, None)
+        self.last_sent[message_id] = fingerprint
+        if len(self.last_sent) > self.max_tracked:
+            del self.last_sent[next(iter(self.last_sent))]
+
+edit_queue = MessageEditQueue(
+    edits_per_window=int(os.getenv('EDITS_PER_CHANNEL_WINDOW', '5')),
+    window=float(os.getenv('EDIT_WINDOW_SECONDS', '5')),
+    max_concurrent=int(os.getenv('COMBAT_EDIT_CONCURRENCY', '10'))
+)
+
+class CombatScheduler:
+    def __init__(self, tick=1.0):
+        self.tick = tick
+        self.combats = {}
+        self._task = None
+
+    async def run(self, combat):
+        if combat in self.combats:
+            return False
+
+        future = asyncio.get_running_loop().create_future()
+        self.combats[combat] = future
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._loop())
+
+        try:
+            await future
+        finally:
+            self.combats.pop(combat, None)
+        return True
+
+    async def _loop(self):
+        while self.combats:
+            await asyncio.sleep(self.tick)
+            profiler.run_sync('combat_tick', self.advance)
+
+    def advance(self):
+        for combat, future in list(self.combats.items()):
+            if future.done():
+                continue
+            if combat.is_combat_ended or combat.is_finished():
+                future.set_result(None)
+                continue
+
+            try:
+                combat.resolve_round()
+                if combat.message:
+                    edit_queue.submit(combat.message, combat.create_combat_embed(), fingerprint=combat.frame.fingerprint)
+            except Exception as e:
+                future.set_exception(e)
+
+combat_scheduler = CombatScheduler(tick=float(os.getenv('COMBAT_TICK_SECONDS', '1')))
+
+COMMAND_SECONDS = metrics.Histogram(
+    'roguelike_command_seconds', "Slash command handling time", ('command',),
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+)
+FIGHTS = metrics.Counter('roguelike_fights_total', "Fights resolved, by mode and outcome", ('mode', 'outcome'))
+FIGHT_SECONDS = metrics.Histogram(
+    'roguelike_fight_seconds', "Wall time of animated fights, from the first frame to the outcome",
+    buckets=(0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+)
+FIGHT_RATE = metrics.RateMeter('roguelike_fights_per_second', "Fights resolved per second over the last minute")
+EDIT_FRAMES_DROPPED = metrics.Counter('roguelike_edit_frames_dropped_total', "Queued message edits superseded or discarded before sending")
+EDIT_DUPLICATES_SKIPPED = metrics.Counter('roguelike_edit_duplicates_skipped_total', "Message edits skipped because the message already shows that frame")
+LOOP_LAG = metrics.Gauge('roguelike_event_loop_lag_last_seconds', "Most recent event loop scheduling delay")
+LOOP_LAG_HISTOGRAM = metrics.Histogram(
+    'roguelike_event_loop_lag_seconds', "Event loop scheduling delay",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+)
+metrics.Gauge('roguelike_active_sessions', "Active sessions by type", ('type',), callback=SessionManager.session_counts)
+metrics.Gauge('roguelike_pending_edits', "Message edits waiting in the edit queue", callback=lambda: edit_queue.depth)
+metrics.Gauge('roguelike_pending_writes', "Character changes waiting to be flushed", callback=lambda: characters.pending)
+loop_lag_monitor = metrics.LoopLagMonitor(LOOP_LAG, LOOP_LAG_HISTOGRAM, interval=float(os.getenv('LOOP_LAG_INTERVAL', '0.5')))
+
+AUTO_BATTLE_LOG_LINES = 5
+COMBAT_SEPARATOR = "═" * 30
+
+class CombatFrameRenderer:
+    __slots__ = (
+        'combat', 'version', 'fingerprint', '_embed', '_player_key', '_player_name', '_player_tail',
+        '_monster', '_monster_name', '_monster_tail'
+    )
+
+    def __init__(self, combat):
+        self.combat = combat
+        self.version = 0
+        self.fingerprint = None
+        self._embed = None
+        self._player_key = None
+        self._player_name = None
+        self._player_tail = None
+        self._monster = None
+        self._monster_name = None
+        self._monster_tail = None
+
+    def _refresh_player(self):
+        player = self.combat.player
+        atk_buff = self.combat.active_effects.get('attack')
+        def_buff = self.combat.active_effects.get('defense')
+        key = (
+            player.level, player.name, player.max_hp, player.atk, player.def_,
+            player.eva, player.luk, player.current_exp,
+            atk_buff['value'] if atk_buff else None,
+            def_buff['value'] if def_buff else None
+        )
+        if key == self._player_key:
+            return
+
+        buff_text_atk = f" (+{atk_buff['value']})" if atk_buff else ""
+        buff_text_def = f" (+{def_buff['value']})" if def_buff else ""
+        self._player_key = key
+        self._player_name = f"👤 Lv.{player.level} {player.name}"
+        self._player_tail = "\n".join([
+            f"/{player.max_hp}",
+            "",
+            f"⚔️ ATK: {int(player.atk)}{buff_text_atk}",
+            "",
+            f"🛡️ DEF: {int(player.def_)}{buff_text_def}",
+            "",
+            f"💨 EVA: {format_stat(player.eva)}",
+            "",
+            f"🍀 LUK: {format_stat(player.luk)}",
+            "",
+            f"📊 EXP: {player.current_exp}/100",
+            ""
+        ])
+        self.version += 1
+
+    def _refresh_monster(self):
+        monster = self.combat.monster
+        if monster is self._monster:
+            return
+
+        self._monster = monster
+        self._monster_name = f"👾 {monster.name}"
+        self._monster_tail = "\n".join([
+            "",
+            "",
+            f"⚔️ ATK: {monster.atk}",
+            "",
+            f"🛡️ DEF: {monster.def_}",
+            ""
+        ])
+        self.version += 1
+
+    def render(self):
+        self._refresh_player()
+        self._refresh_monster()
+        combat_log = tuple(self.combat.combat_log)
+        fingerprint = (self.version, self.combat.player.current_hp, self._monster.hp, combat_log)
+        if fingerprint == self.fingerprint:
+            return self._embed
+
+        embed = discord.Embed(
+            title="⚔️ Combat Arena ⚔️",
+            color=discord.Color.blue(),
+            description=COMBAT_SEPARATOR
+        )
+        embed.add_field(
+            name=self._player_name,
+            value=f"\n❤️ HP: {self.combat.player.current_hp}{self._player_tail}",
+            inline=True
+        )
+        embed.add_field(
+            name=self._monster_name,
+            value=f"\n❤️ HP: {self._monster.hp}{self._monster_tail}",
+            inline=True
+        )
+        embed.add_field(
+            name=COMBAT_SEPARATOR,
+            value="\n".join(combat_log) if combat_log else "Combat starting...",
+            inline=False
+        )
+
+        self.fingerprint = fingerprint
+        self._embed = embed
+        return embed
 
 class CombatSystem:
-    def __init__(self, player_data):
+    __slots__ = (
+        'player', 'auto_resolve', 'seed', 'rng', 'replay', 'replay_saved', 'frame', 'combat_log',
+        'active_effects', 'message', 'view', 'is_combat_ended', 'in_fight', 'initial_stats', 'monster', 'next_monster'
+    )
+
+    def __init__(self, player_data, auto_resolve=False, seed=None):
         self.player = player_data
+        self.auto_resolve = auto_resolve
+        self.seed = replays.new_seed() if seed is None else seed
+        self.rng = random.Random(self.seed)
+        self.replay = replays.ReplayRecorder(player_data, self.seed)
+        self.replay_saved = False
+        self.frame = CombatFrameRenderer(self)
         self.combat_log = []
         self.active_effects = {}
         self.message = None
+        self.view = None
         self.is_combat_ended = False
-        self.initial_stats = {
-            'level': self.player['level'],
-            'atk': self.player['atk'],
-            'def': self.player['def'],
-            'eva': self.player['eva'],
-            'luk': self.player['luk']
-        }
+        self.in_fight = False
+        self.initial_stats = {'level': self.player.level, **self.player.stats()}
         self.monster = None
         self.next_monster = None
         self.next_monster = self.generate_monster()
 
     def generate_monster(self):
-        player_level = self.player['level']
-        min_level = max(1, player_level - 2)
-        max_level = player_level + 2
-        possible_levels = list(range(min_level, max_level + 1))
-        weights = []
-        
-        for level in possible_levels:
-            if level == player_level:
-                weights.append(0.4)
-            elif level < player_level:
-                weights.append(0.35 / len([l for l in possible_levels if l < player_level]))
-            else:
-                weights.append(0.25 / len([l for l in possible_levels if l > player_level]))
-        
-        monster_level = random.choices(possible_levels, weights=weights)[0]
-        new_monster = Monster(monster_level)
-        
-        level_diff = monster_level - player_level
-        scaling_factor = 1 + (0.1 * level_diff)
-        
-        if level_diff > 0:
-            new_monster.atk = int(new_monster.atk * 0.9)
-            new_monster.def_ = int(new_monster.def_ * 0.9)
-        elif level_diff < 0:
-            new_monster.atk = int(new_monster.atk * 1.1)
-            new_monster.def_ = int(new_monster.def_ * 1.1)
-
-        new_monster.hp = int(min(100, new_monster.hp * scaling_factor))
-        return new_monster
+        return combat_engine.generate_monster(self.player.level, self.rng)
 
     async def start_combat(self, interaction):
+        if await self.open_fight(interaction):
+            await self.run_combat_loop(interaction)
+
+    async def open_fight(self, interaction):
+        if self.auto_resolve:
+            await self.auto_battle(interaction)
+            return False
+        if self.in_fight:
+            await self._acknowledge(interaction)
+            return False
+
+        self.in_fight = True
+        try:
+            await self._start_fight(interaction)
+        except BaseException:
+            self.in_fight = False
+            raise
+        return True
+
+    async def _start_fight(self, interaction):
+        self._show_view(None)
         self.is_combat_ended = False
+        self._touch()
+        self.replay.fight(self.player)
         
         self.monster = self.next_monster
         self.next_monster = self.generate_monster()
         
-        if 'damage' in self.active_effects:
-            damage = random.randint(*GameData.POTS['dmg_pot']['value'])
-            self.monster.hp -= damage
-            self.combat_log = [f"💥 Damage potion dealt {damage} damage!"]
-            del self.active_effects['damage']
-        else:
+        self.combat_log = []
+        if not combat_engine.apply_opening_effects(self.monster, self.active_effects, self.rng, self.combat_log):
             self.combat_log = ["Combat started!"]
         
         embed = self.create_combat_embed()
         
         if not self.message:
             await interaction.response.send_message(embed=embed)
-            self.message = await interaction.original_response()
         else:
             try:
                 await interaction.response.defer()
-                await self.update_message(embed)
+                await self.update_message(embed, fingerprint=self.frame.fingerprint)
             except discord.InteractionResponded:
-                await self.update_message(embed)
-        
-        await self.run_combat_loop()
-
-    async def run_combat_loop(self):
-        while not self.is_combat_ended:
-            await asyncio.sleep(1)
-            
-            if self.player['current_hp'] <= 0 or self.monster.hp <= 0:
-                break
-
-            self.apply_effects()
-            self.player_attack()
-            if self.monster.hp > 0:
-                self.monster_attack()
-            
-            if self.monster.hp <= 0:
-                self.active_effects.clear()
+                await self.update_message(embed, fingerprint=self.frame.fingerprint)
 
-            self.combat_log = self.combat_log[-3:]
-            await self.update_message(self.create_combat_embed())
+    async def bind_message(self, interaction):
+        if self.message is None:
+            self.message = await interaction.original_response()
 
-        await self.end_combat()
+    async def run_combat_loop(self, interaction):
+        try:
+            await self.bind_message(interaction)
+            start = time.perf_counter()
+            if await combat_scheduler.run(self):
+                FIGHT_SECONDS.observe(time.perf_counter() - start)
+                await self.end_combat()
+        finally:
+            self.in_fight = False
 
-    def apply_effects(self):
-        total_atk = self.player['atk']
-        total_def = self.player['def']
-        
-        for effect, data in self.active_effects.items():
-            if effect == 'attack':
-                total_atk += data['value']
-            elif effect == 'defense':
-                total_def += data['value']
-
-        self.total_atk = total_atk
-        self.total_def = total_def
-
-    def player_attack(self):
-        base_damage = self.total_atk - (self.monster.def_ * 0.5)
-        damage_roll = random.uniform(0.8, 1.2)
-        damage_to_monster = max(1, int(base_damage * damage_roll))
-        
-        crit_chance = min(0.25, self.player['luk'] * 0.01)
-        if random.random() < crit_chance:
-            damage_to_monster = int(damage_to_monster * 1.5)
-            self.combat_log.append(f"💥 CRITICAL HIT! You deal {damage_to_monster} damage!")
-        else:
-            self.combat_log.append(f"🗡️ You deal {damage_to_monster} damage!")
-        
-        self.monster.hp = max(0, self.monster.hp - damage_to_monster)
+    def is_finished(self):
+        return combat_engine.fight_outcome(self.player, self.monster) is not None
 
-    def monster_attack(self):
-        base_monster_damage = self.monster.atk - (self.total_def * 0.5)
-        monster_damage_roll = random.uniform(0.8, 1.2)
-        damage_to_player = max(1, int(base_monster_damage * monster_damage_roll))
-        
-        if random.random() > (1 - min(0.75, self.player['eva'] * 0.015)):
-            self.combat_log.append("✨ You evaded the attack!")
-            return
-        
-        if random.random() < 0.10:
-            damage_to_player = int(damage_to_player * 1.5)
-            self.combat_log.append(f"💥 CRITICAL HIT! Monster deals {damage_to_player} damage!")
-        else:
-            self.combat_log.append(f"☠️ Monster deals {damage_to_player} damage!")
-        
-        self.player['current_hp'] = max(0, self.player['current_hp'] - damage_to_player)
+    def resolve_round(self):
+        combat_engine.resolve_round(self.player, self.monster, self.active_effects, self.rng, self.combat_log)
+        self.combat_log = self.combat_log[-3:]
 
     async def end_combat(self):
-        if self.player['current_hp'] <= 0:
+        self._touch()
+        self.replay.settle(self.player)
+        outcome = combat_engine.fight_outcome(self.player, self.monster)
+        if outcome is not None:
+            self._record_fight('animated', outcome)
+        if self.player.current_hp <= 0:
             await self.handle_player_death()
         elif self.monster.hp <= 0:
             await self.handle_victory()
 
-    async def update_message(self, embed, view=None):
+    def _touch(self):
+        SessionManager.touch(self.player.user_id, self)
+
+    @staticmethod
+    async def _acknowledge(interaction):
+        try:
+            await interaction.response.defer()
+        except (discord.InteractionResponded, discord.NotFound):
+            pass
+
+    def _show_view(self, view):
+        if self.view is not None and self.view is not view:
+            self.view.stop()
+        self.view = view
+        return view
+
+    async def expire(self):
+        self.is_combat_ended = True
+        self.active_effects.clear()
+        if characters.get(self.player.user_id) is self.player:
+            self.save_player_data(reason='expire')
+        self.save_replay()
+        self._show_view(None)
+
         if self.message:
-            try:
-                await self.message.edit(embed=embed, view=view)
-            except discord.NotFound:
-                pass
-    
-    def calculate_exp_gain(self):
-        level_diff = self.monster.level - self.player['level']
-        base_exp = 10
-        
-        if level_diff > 0:
-            exp_gain = base_exp * (1 + (level_diff * 0.5))
-        elif level_diff < 0:
-            exp_gain = max(1, base_exp * (1 + (level_diff * 0.3)))
-        else:
-            exp_gain = base_exp
-            
-        exp_gain *= (1 + (self.player['level'] * 0.1))
-        
-        return int(exp_gain)
+            embed = await self._create_session_summary()
+            embed.title = "⌛ Combat Session Expired ⌛"
+            edit_queue.submit(self.message, embed)
+            self.message = None
+
+    @staticmethod
+    def _record_fight(mode, outcome):
+        FIGHTS.inc(mode, outcome)
+        FIGHT_RATE.mark()
+
+    async def update_message(self, embed, view=None, fingerprint=None):
+        if self.message:
+            await edit_queue.submit(self.message, embed, view, fingerprint)
     
     async def handle_victory(self):
-        exp_gained = self.calculate_exp_gain()
-        self.player['current_exp'] += exp_gained
-        
-        level_up_message = await self._process_level_up()
-        loot = self._process_loot()
-        await self._send_victory_message(exp_gained, loot, level_up_message)
-        
-    async def _process_level_up(self):
-        if self.player['current_exp'] < 100:
-            return ""
-            
-        initial_stats = {
-            'atk': self.player['atk'],
-            'def': self.player['def'],
-            'eva': self.player['eva'],
-            'luk': self.player['luk']
-        }
-        
-        self._apply_level_up()
-        return self._create_level_up_message(initial_stats)
-        
-    def _apply_level_up(self):
-        self.player['level'] += 1
-        self.player['current_exp'] = 0
-        
-        stat_increases = {
-            'atk': 0.6,
-            'def': 0.7,
-            'eva': 0.4,
-            'luk': 0.3
-        }
-        
-        for stat, increase in stat_increases.items():
-            self.player[stat] = round(self.player[stat] + increase, 1)
-            if self.player[stat] % 1 == 0:
-                self.player[stat] = int(self.player[stat])
-        
-        heal_amount = 40
-        old_hp = self.player['current_hp']
-        self.player['current_hp'] = min(self.player['max_hp'], old_hp + heal_amount)
-        
+        result = combat_engine.resolve_victory(self.player, self.monster, self.rng)
+        self.save_player_data()
+        await self.update_message(self._create_victory_embed(result), view=self._show_view(CombatButtons(self)))
+
+    async def auto_battle(self, interaction):
+        if self.in_fight:
+            await self._acknowledge(interaction)
+            return
+
+        self.in_fight = True
+        try:
+            await self._auto_fight(interaction)
+        finally:
+            self.in_fight = False
+
+    async def _auto_fight(self, interaction):
+        self._show_view(None)
+        self.is_combat_ended = False
+        self._touch()
+        self.replay.fight(self.player, auto=True)
+
+        self.monster = self.next_monster
+        self.next_monster = self.generate_monster()
+
+        battle_log = []
+        result = combat_engine.resolve_fight(self.player, self.monster, self.active_effects, self.rng, battle_log)
+        self.replay.settle(self.player)
+        self._record_fight('auto', result['outcome'])
+        self.combat_log = battle_log[-3:]
+
+        if result['outcome'] == 'victory':
+            self.save_player_data()
+            embed = self._create_victory_embed(result)
+            view = self._show_view(CombatButtons(self))
+        else:
+            await self._record_death()
+            embed = self._create_death_embed()
+            view = None
+
+        embed.add_field(
+            name=f"📜 Battle Log ({result['rounds']} rounds)",
+            value="\n".join(battle_log[-AUTO_BATTLE_LOG_LINES:]),
+            inline=False
+        )
+
+        if not self.message:
+            await interaction.response.send_message(embed=embed, view=view)
+            return
+
+        edit_queue.discard(self.message)
+        try:
+            await interaction.response.edit_message(embed=embed, view=view)
+        except discord.InteractionResponded:
+            await self.update_message(embed, view=view)
+
     def _create_level_up_message(self, initial_stats):
         stat_changes = []
-        for stat in ['atk', 'def', 'eva', 'luk']:
-            if self.player[stat] != initial_stats[stat]:
+        for stat in STATS:
+            if self.player.stat(stat) != initial_stats[stat]:
                 stat_changes.append(
-                    f"{stat.upper()}: {initial_stats[stat]} → {self.player[stat]}"
+                    f"{stat.upper()}: {format_stat(initial_stats[stat])} → {format_stat(self.player.stat(stat))}"
                 )
         
         return (
             "🎊 **LEVEL UP!**\n"
-            f"You are now level {self.player['level']}!\n"
+            f"You are now level {self.player.level}!\n"
             f"**Stat Increases:**\n" +
             "\n".join(stat_changes) + "\n" +
-            "Healed for 40 HP!"
+            f"Healed for {combat_engine.LEVEL_UP_HEAL} HP!"
         )
         
-    def _process_loot(self):
-        loot = LootSystem.generate_loot(self.player['luk'])
-        self.player['coins'] += loot['coins']
-        
-        for pot, amount in loot['pots'].items():
-            if pot not in self.player['pots']:
-                self.player['pots'][pot] = 0
-            self.player['pots'][pot] += amount
-            
-        return loot
-        
-    async def _send_victory_message(self, exp_gained, loot, level_up_message):
+    def _create_victory_embed(self, result):
+        exp_gained = result['exp_gained']
+        loot = result['loot']
+        level_up_message = ""
+        if result['initial_stats']:
+            level_up_message = self._create_level_up_message(result['initial_stats'])
+
         victory_embed = discord.Embed(title="🎉 Victory!", color=discord.Color.green())
         next_monster_text = (
             f"\n**Next Monster:**\n"
@@ -577,7 +883,7 @@ class CombatSystem:
         victory_embed.description = (
             f"You defeated the {self.monster.name}!\n\n"
             f"**Rewards:**\n"
-            f"🔰 EXP: {exp_gained} ({self.player['current_exp']}/100)\n"
+            f"🔰 EXP: {exp_gained} ({self.player.current_exp}/100)\n"
             f"💰 Coins: {loot['coins']}\n\n"
             f"{level_up_message}\n"
             f"{next_monster_text}"
@@ -587,145 +893,56 @@ class CombatSystem:
             pots_text = "\n".join([f"🧪 {pot}: {amt}" for pot, amt in loot['pots'].items()])
             victory_embed.add_field(name="Potions Found", value=pots_text)
 
-        self.save_player_data()
-
-        if self.message:
-            await self.message.edit(embed=victory_embed, view=CombatButtons(self))
+        return victory_embed
 
     def create_combat_embed(self):
-        embed = discord.Embed(
-            title="⚔️ Combat Arena ⚔️",
-            color=discord.Color.blue()
-        )
-        embed.description = "═" * 30
-                
-        buff_text_atk = ""
-        buff_text_def = ""
-            
-        for effect, data in self.active_effects.items():
-            if effect == 'attack':
-                buff_text_atk = f" (+{data['value']})"
-            elif effect == 'defense':
-                buff_text_def = f" (+{data['value']})"
-            
-        player_status = [
-            "",
-            f"❤️ HP: {self.player['current_hp']}/{self.player['max_hp']}",
-            "",
-            f"⚔️ ATK: {int(self.player['atk'])}{buff_text_atk}",
-            "",
-            f"🛡️ DEF: {int(self.player['def'])}{buff_text_def}",
-            "",
-            f"💨 EVA: {self.player['eva']}",
-            "",
-            f"🍀 LUK: {self.player['luk']}",
-            "",
-            f"📊 EXP: {self.player['current_exp']}/100",
-            ""
-        ]
-        
-        embed.add_field(
-            name=f"👤 Lv.{self.player['level']} {self.player['name']}",
-            value="\n".join(player_status), 
-            inline=True
-        )
-        
-        monster_status = [
-            "",
-            f"❤️ HP: {self.monster.hp}",
-            "",
-            f"⚔️ ATK: {self.monster.atk}",
-            "",
-            f"🛡️ DEF: {self.monster.def_}",
-            ""
-        ]
-        embed.add_field(
-            name=f"👾 {self.monster.name}", 
-            value="\n".join(monster_status), 
-            inline=True
-        )
-        
-        embed.add_field(
-            name="═" * 30, 
-            value="\n".join(self.combat_log) if self.combat_log else "Combat starting...",
-            inline=False
-        )
-        
-        return embed
+        return self.frame.render()
 
     async def handle_player_death(self):
-        SessionManager.end_session(self.player['user_id'])
-        
-        HighScoreSystem.record_score(
-            self.player['user_id'],
-            self.player['name'],
-            self.player['level'],
-            await bot.fetch_user(int(self.player['user_id']))
-        )
-        
-        with open(DBFILE, 'r') as f:
-            data = json.load(f)
-        del data[self.player['user_id']]
-        with open(DBFILE, 'w') as f:
-            json.dump(data, f, indent=4)
+        await self._record_death()
+        await self.update_message(self._create_death_embed())
+
+    async def _record_death(self):
+        self.save_replay()
+        self._show_view(None)
+        
+        score = None
+        if HighScoreSystem.qualifies(self.player.level):
+            score = HighScoreSystem.record_score(
+                self.player.user_id,
+                self.player.name,
+                self.player.level,
+                await bot.fetch_user(int(self.player.user_id))
+            )
         
-        death_embed = discord.Embed(
+        characters.delete(self.player.user_id, score=score)
+        SessionManager.end_session(self.player.user_id)
+
+    def _create_death_embed(self):
+        return discord.Embed(
             title="💀 You Have Fallen!",
             description=(
-                f"Your level {self.player['level']} journey has ended.\n"
+                f"Your level {self.player.level} journey has ended.\n"
                 f"Your legacy has been recorded in the Hall of Champions."
             ),
             color=discord.Color.red()
         )
-        
-        if self.message:
-            await self.message.edit(embed=death_embed, view=None)
 
-    def save_player_data(self):
-        with open(DBFILE, 'r+') as f:
-            data = json.load(f)
-            data[self.player['user_id']] = self.player
-            f.seek(0)
-            json.dump(data, f, indent=4)
-            f.truncate()
+    def save_player_data(self, reason='fight'):
+        characters.save(self.player, reason=reason)
 
     async def use_potion(self, interaction, pot_name):
-        if self.player['pots'].get(pot_name, 0) <= 0:
-            return
-
-        pot_data = None
-        if pot_name in GameData.POTS:
-            pot_data = GameData.POTS[pot_name]
-        elif pot_name in GameData.SPECIAL_POTS:
-            pot_data = GameData.SPECIAL_POTS[pot_name]
-        
-        if not pot_data:
+        self.replay.sync(self.player)
+        self.combat_log = []
+        if not combat_engine.apply_potion(self.player, self.active_effects, pot_name, log=self.combat_log):
             return
+        self.replay.potion(self.player, pot_name)
 
-        self.player['pots'][pot_name] -= 1
-        
-        if pot_data['effect'] == 'heal':
-            heal_amount = pot_data['value']
-            old_hp = self.player['current_hp']
-            self.player['current_hp'] = min(self.player['max_hp'], old_hp + heal_amount)
-            actual_heal = self.player['current_hp'] - old_hp
-            self.combat_log = [f"💚 Healed for {actual_heal} HP!"]
-        elif pot_data['effect'] in ['attack', 'defense']:
-            self.active_effects[pot_data['effect']] = {
-                'value': pot_data['value']
-            }
-            self.combat_log = [f"✨ {pot_data['effect'].title()} buff activated!"]
-        elif pot_data['effect'] == 'damage':
-            self.active_effects['damage'] = {
-                'value': pot_data['value']
-            }
-            self.combat_log = ["💥 Preparing to use damage potion..."]
-
-        self.save_player_data()
+        self.save_player_data(reason='potion')
         await self.start_combat(interaction)
 
     async def show_pot_selection(self, interaction):
-        if not any(self.player['pots'].values()):
+        if not any(self.player.pots.values()):
             await interaction.response.send_message("You don't have any potions!", ephemeral=True)
             return
 
@@ -736,9 +953,9 @@ class CombatSystem:
 
         player_stats = (
             f"**Your Stats:**\n"
-            f"❤️ HP: {self.player['current_hp']}/{self.player['max_hp']}\n"
-            f"⚔️ ATK: {self.player['atk']}\n"
-            f"🛡️ DEF: {self.player['def']}\n"
+            f"❤️ HP: {self.player.current_hp}/{self.player.max_hp}\n"
+            f"⚔️ ATK: {format_stat(self.player.atk)}\n"
+            f"🛡️ DEF: {format_stat(self.player.def_)}\n"
         )
         pot_embed.add_field(
             name="Current Status",
@@ -760,7 +977,7 @@ class CombatSystem:
         )
 
         pot_sections = []
-        for pot_name, quantity in self.player['pots'].items():
+        for pot_name, quantity in self.player.pots.items():
             if quantity > 0:
                 if pot_name in GameData.POTS:
                     desc = GameData.POTS[pot_name]['description']
@@ -777,12 +994,15 @@ class CombatSystem:
                 inline=False
             )
 
-        view = PotionButtons(self, self.player['pots'])
+        self._touch()
+        view = self._show_view(PotionButtons(self, self.player.pots))
         
         try:
+            if self.message:
+                edit_queue.discard(self.message)
             await interaction.response.edit_message(embed=pot_embed, view=view)
         except discord.InteractionResponded:
-            await self.message.edit(embed=pot_embed, view=view)
+            await self.update_message(pot_embed, view=view)
     
     async def end_combat_session(self, interaction=None):
         self._cleanup_session()
@@ -792,32 +1012,40 @@ class CombatSystem:
     def _cleanup_session(self):
         self.is_combat_ended = True
         self.active_effects.clear()
-        SessionManager.end_session(self.player['user_id'])
+        SessionManager.end_session(self.player.user_id)
+        self.save_replay()
+
+    def save_replay(self):
+        if not replays.REPLAY_FILE or self.replay_saved:
+            return
+        self.replay_saved = True
+        record = self.replay.to_record(self.player)
+        replays.writer.save(record, replays.REPLAY_FILE)
 
     def _get_stat_progress(self):
         stat_progress = []
-        for stat in ['atk', 'def', 'eva', 'luk']:
+        for stat in STATS:
             initial = self.initial_stats[stat]
-            current = self.player[stat]
+            current = self.player.stat(stat)
             if initial != current:
-                stat_progress.append(f"➤ {stat.upper()}: {initial} → {current}")
+                stat_progress.append(f"➤ {stat.upper()}: {format_stat(initial)} → {format_stat(current)}")
         return stat_progress
 
     def _get_inventory_text(self):
         inventory_text = [
-            f"💰 Coins: {self.player['coins']}",
+            f"💰 Coins: {self.player.coins}",
             "",
             "**Potions:**"
         ]
         
-        for pot_name, quantity in self.player['pots'].items():
+        for pot_name, quantity in self.player.pots.items():
             if quantity > 0:
                 inventory_text.append(f"🧪 {pot_name.replace('_', ' ').title()}: {quantity}")
         return inventory_text
 
     async def _create_session_summary(self):
-        current_level = self.player['level']
-        current_exp = self.player['current_exp']
+        current_level = self.player.level
+        current_exp = self.player.current_exp
         levels_gained = current_level - self.initial_stats['level']
         
         embed = discord.Embed(
@@ -864,7 +1092,7 @@ class CombatSystem:
             except discord.HTTPException as e:
                 print(f"Error deferring interaction: {e}")
         
-        await self.update_message(embed, view=EndSessionButton())
+        await self.update_message(embed, view=self._show_view(EndSessionButton()))
 
 class CombatButtons(discord.ui.View):
     def __init__(self, combat_system):
@@ -875,9 +1103,13 @@ class CombatButtons(discord.ui.View):
     async def continue_button(self, interaction: discord.Interaction, button: discord.ui.Button):
         await self.combat_system.start_combat(interaction)
 
+    @discord.ui.button(label="Auto Battle", style=discord.ButtonStyle.secondary)
+    async def auto_battle_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self.combat_system.auto_battle(interaction)
+
     @discord.ui.button(label="Use Potion", style=discord.ButtonStyle.primary)
     async def use_pot_button(self, interaction: discord.Interaction, button: discord.ui.Button):
-        if not any(self.combat_system.player['pots'].values()):
+        if not any(self.combat_system.player.pots.values()):
             await interaction.response.send_message("You don't have any potions!", ephemeral=True)
             return
         await self.combat_system.show_pot_selection(interaction)
@@ -940,13 +1172,29 @@ class ShopSystem:
     def __init__(self, player_data):
         self.player = player_data
         self.message = None
+        self.view = None
+
+    def _show_view(self, view):
+        if self.view is not None and self.view is not view:
+            self.view.stop()
+        self.view = view
+        return view
+
+    async def expire(self):
+        self._show_view(None)
+        if self.message:
+            try:
+                await self.message.delete()
+            except discord.HTTPException:
+                pass
+            self.message = None
         
     def create_shop_embed(self):
         embed = discord.Embed(
             title="🏪 Item Shop",
             description=(
-                f"Your Coins: 💰 {self.player['coins']}\n"
-                f"Current EXP: 📊 {self.player['current_exp']}/100"
+                f"Your Coins: 💰 {self.player.coins}\n"
+                f"Current EXP: 📊 {self.player.current_exp}/100"
             ),
             color=discord.Color.gold()
         )
@@ -982,21 +1230,26 @@ class ShopSystem:
         return embed
 
     async def show_shop(self, interaction):
+        SessionManager.touch(self.player.user_id, self)
         embed = self.create_shop_embed()
-        view = ShopButtons(self)
+        view = self._show_view(ShopButtons(self))
         
         if not self.message:
             await interaction.response.send_message(embed=embed, view=view)
-            self.message = await interaction.original_response()
         else:
             await self.message.edit(embed=embed, view=view)
 
+    async def bind_message(self, interaction):
+        if self.message is None:
+            self.message = await interaction.original_response()
+
     async def purchase_item(self, interaction, item_id):
+        SessionManager.touch(self.player.user_id, self)
         if not await self._validate_purchase(interaction, item_id):
             return
 
         item_price = self._get_item_price(item_id)
-        self.player['coins'] -= item_price
+        self.player.coins -= item_price
 
         if item_id == 'exp_pot':
             await self._handle_exp_potion(interaction)
@@ -1015,7 +1268,7 @@ class ShopSystem:
             )
             return False
             
-        if self.player['coins'] < item_data['price']:
+        if self.player.coins < item_data['price']:
             await interaction.response.send_message(
                 "❌ Not enough coins!", 
                 ephemeral=True
@@ -1037,9 +1290,9 @@ class ShopSystem:
 
     def _apply_exp_potion(self):
         initial_stats = None
-        self.player['current_exp'] += GameData.SPECIAL_POTS['exp_pot']['value']
+        self.player.current_exp += GameData.SPECIAL_POTS['exp_pot']['value']
         
-        while self.player['current_exp'] >= 100:
+        while self.player.current_exp >= 100:
             if not initial_stats:
                 initial_stats = self._capture_current_stats()
             
@@ -1048,17 +1301,11 @@ class ShopSystem:
         return initial_stats
 
     def _capture_current_stats(self):
-        return {
-            'atk': self.player['atk'],
-            'def': self.player['def'],
-            'eva': self.player['eva'],
-            'luk': self.player['luk'],
-            'level': self.player['level']
-        }
+        return {'level': self.player.level, **self.player.stats()}
 
     def _apply_level_up(self):
-        self.player['level'] += 1
-        self.player['current_exp'] -= 100
+        self.player.level += 1
+        self.player.current_exp -= 100
         
         stat_increases = {
             'atk': 0.6,
@@ -1068,32 +1315,30 @@ class ShopSystem:
         }
         
         for stat, increase in stat_increases.items():
-            self.player[stat] = round(self.player[stat] + increase, 1)
-            if self.player[stat] % 1 == 0:
-                self.player[stat] = int(self.player[stat])
+            self.player.set_stat(stat, round(self.player.stat(stat) + increase, 1))
 
     def _create_level_up_message(self, initial_stats):
-        if not initial_stats or self.player['level'] <= initial_stats['level']:
+        if not initial_stats or self.player.level <= initial_stats['level']:
             return None
             
         stat_changes = []
-        for stat in ['atk', 'def', 'eva', 'luk']:
-            if self.player[stat] != initial_stats[stat]:
+        for stat in STATS:
+            if self.player.stat(stat) != initial_stats[stat]:
                 stat_changes.append(
-                    f"{stat.upper()}: {initial_stats[stat]} → {self.player[stat]}"
+                    f"{stat.upper()}: {format_stat(initial_stats[stat])} → {format_stat(self.player.stat(stat))}"
                 )
         
         return (
             "🎊 **LEVEL UP!**\n"
-            f"You are now level {self.player['level']}!\n"
+            f"You are now level {self.player.level}!\n"
             f"**Stat Increases:**\n" +
             "\n".join(stat_changes)
         )
 
     async def _handle_regular_potion(self, interaction, item_id):
-        if item_id not in self.player['pots']:
-            self.player['pots'][item_id] = 0
-        self.player['pots'][item_id] += 1
+        if item_id not in self.player.pots:
+            self.player.pots[item_id] = 0
+        self.player.pots[item_id] += 1
         
         await interaction.response.defer()
         await self.show_shop(interaction)
@@ -1111,15 +1356,15 @@ class ShopSystem:
             embed.add_field(
                 name="Shop Status",
                 value=(
-                    f"Your Coins: 💰 {self.player['coins']}\n"
-                    f"Current EXP: 📊 {self.player['current_exp']}/100"
+                    f"Your Coins: 💰 {self.player.coins}\n"
+                    f"Current EXP: 📊 {self.player.current_exp}/100"
                 ),
                 inline=False
             )
             
             await interaction.response.edit_message(
                 embed=embed,
-                view=ShopButtons(self)
+                view=self._show_view(ShopButtons(self))
             )
             
             await asyncio.sleep(2)
@@ -1133,12 +1378,7 @@ class ShopSystem:
         await self.show_shop(interaction)
 
     def _save_player_data(self):
-        with open(DBFILE, 'r+') as f:
-            data = json.load(f)
-            data[self.player['user_id']] = self.player
-            f.seek(0)
-            json.dump(data, f, indent=4)
-            f.truncate()
+        characters.save(self.player, reason='purchase')
 
 class ShopButtons(discord.ui.View):
     def __init__(self, shop_system):
@@ -1152,7 +1392,7 @@ class ShopButtons(discord.ui.View):
                 label=f"{item_id.replace('_', ' ').title()} ({data['price']}💰)",
                 style=discord.ButtonStyle.primary,
                 custom_id=item_id,
-                disabled=self.shop.player['coins'] < data['price']
+                disabled=self.shop.player.coins < data['price']
             )
             button.callback = self.create_callback(item_id)
             self.add_item(button)
@@ -1162,7 +1402,7 @@ class ShopButtons(discord.ui.View):
                 label=f"{item_id.replace('_', ' ').title()} ({data['price']}💰)",
                 style=discord.ButtonStyle.secondary,
                 custom_id=item_id,
-                disabled=self.shop.player['coins'] < data['price']
+                disabled=self.shop.player.coins < data['price']
             )
             button.callback = self.create_callback(item_id)
             self.add_item(button)
@@ -1180,18 +1420,19 @@ class ShopButtons(discord.ui.View):
         return callback
 
     async def exit_callback(self, interaction):
-        SessionManager.end_session(self.shop.player['user_id'])
+        SessionManager.end_session(self.shop.player.user_id)
+        self.shop._show_view(None)
         await interaction.message.delete()
 
 class ProfileButtons(discord.ui.View):
     def __init__(self, player_data):
-        super().__init__(timeout=None)
+        super().__init__(timeout=SESSION_TTL)
         self.player = player_data
         self.add_healing_buttons()
 
     def add_healing_buttons(self):
-        heal_pot_count = self.player['pots'].get('heal_pot', 0)
-        greater_pot_count = self.player['pots'].get('hp_pot_plus', 0)
+        heal_pot_count = self.player.pots.get('heal_pot', 0)
+        greater_pot_count = self.player.pots.get('hp_pot_plus', 0)
 
         heal_button = discord.ui.Button(
             label=f"Use Healing Pot ({heal_pot_count})",
@@ -1221,200 +1462,368 @@ class ProfileButtons(discord.ui.View):
 
     def create_heal_callback(self, pot_type):
         async def callback(interaction):
-            if self.player['pots'].get(pot_type, 0) > 0:
-                pot_data = (GameData.POTS.get(pot_type) or 
-                          GameData.SPECIAL_POTS.get(pot_type))
-                
-                heal_amount = pot_data['value']
-                old_hp = self.player['current_hp']
-                self.player['current_hp'] = min(self.player['max_hp'], 
-                                              old_hp + heal_amount)
-                self.player['pots'][pot_type] -= 1
+            user_id = self.player.user_id
+            if not await SessionManager.claim(user_id):
+                await interaction.response.send_message(BUSY_MESSAGE, ephemeral=True)
+                return
+
+            try:
+                player = characters.get(user_id)
+                if player is None:
+                    await interaction.response.send_message("Your character has died and all data is lost.", ephemeral=True)
+                    return
+                self.player = player
+
+                if self.player.pots.get(pot_type, 0) > 0:
+                    pot_data = (GameData.POTS.get(pot_type) or 
+                              GameData.SPECIAL_POTS.get(pot_type))
                 
-                with open(DBFILE, 'r+') as f:
-                    data = json.load(f)
-                    data[self.player['user_id']] = self.player
-                    f.seek(0)
-                    json.dump(data, f, indent=4)
-                    f.truncate()
+                    heal_amount = pot_data['value']
+                    old_hp = self.player.current_hp
+                    self.player.current_hp = min(self.player.max_hp, 
+                                                  old_hp + heal_amount)
+                    self.player.pots[pot_type] -= 1
                 
-                embed = discord.Embed(title=f"{self.player['name']}'s Profile", color=discord.Color.blue())
-                embed.add_field(name="Level", value=self.player['level'], inline=True)
-                embed.add_field(name="HP", value=f"{self.player['current_hp']}/{self.player['max_hp']}", inline=True)
-                embed.add_field(name="EXP", value=self.player['current_exp'], inline=True)
-                embed.add_field(name="Attack", value=self.player['atk'], inline=True)
-                embed.add_field(name="Defense", value=self.player['def'], inline=True)
-                embed.add_field(name="Evasion", value=self.player['eva'], inline=True)
-                embed.add_field(name="Luck", value=self.player['luk'], inline=True)
-                embed.add_field(name="Coins", value=self.player['coins'], inline=True)
+                    characters.save(self.player, reason='potion')
                 
-                pots = "\n".join([f"{pot}: {quantity}" for pot, quantity in self.player['pots'].items()])
-                embed.add_field(name="Potions", value=pots if pots else "None", inline=False)
+                    embed = Utils.create_profile_embed(self.player, interaction.user.avatar.url)
 
-                embed.set_thumbnail(url=interaction.user.avatar.url)
-                embed.set_footer(text="Character Profile")
+                    self.stop()
+                    await interaction.response.edit_message(
+                        embed=embed,
+                        view=ProfileButtons(self.player)
+                    )
+            finally:
+                SessionManager.release(user_id)
 
-                await interaction.response.edit_message(
-                    embed=embed,
-                    view=ProfileButtons(self.player)
-                )
-            
         return callback
 
     async def exit_callback(self, interaction):
+        self.stop()
         await interaction.message.delete()
 
 class EndSessionButton(discord.ui.View):
     def __init__(self):
-        super().__init__(timeout=None)
+        super().__init__(timeout=SESSION_TTL)
         
     @discord.ui.button(label="Okay", style=discord.ButtonStyle.primary)
     async def okay_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.stop()
         await interaction.message.delete()
 
-@bot.tree.command(name="shop", description="Browse and purchase items")
+@discord.app_commands.command(name="shop", description="Browse and purchase items")
 async def shop(interaction: discord.Interaction):
+    shop_system = await open_shop(interaction)
+    if shop_system is not None:
+        await shop_system.bind_message(interaction)
+
+@metrics.timed(COMMAND_SECONDS, 'shop')
+@profiler.profiled('shop')
+async def open_shop(interaction):
     user_id = str(interaction.user.id)
-    
-    if not Utils.user_has_character(user_id):
-        await interaction.response.send_message(
-            "Create a character first!", 
-            ephemeral=True
-        )
-        return
 
-    current_session = SessionManager.get_session(user_id)
-    if current_session:
-        await interaction.response.send_message(
-            f"You are currently in a {current_session} session. Complete or exit it first!", 
-            ephemeral=True
-        )
+    if not await SessionManager.claim(user_id):
+        await interaction.response.send_message(BUSY_MESSAGE, ephemeral=True)
         return
 
-    if not SessionManager.start_session(user_id, "shop"):
-        await interaction.response.send_message(
-            "You are already in a session!", 
-            ephemeral=True
-        )
-        return
+    try:
+        if not Utils.user_has_character(user_id):
+            await interaction.response.send_message(
+                "Create a character first!", 
+                ephemeral=True
+            )
+            return
+
+        current_session = SessionManager.get_session(user_id)
+        if current_session:
+            await interaction.response.send_message(
+                f"You are currently in a {current_session} session. Complete or exit it first!", 
+                ephemeral=True
+            )
+            return
 
-    with open(DBFILE, 'r') as f:
-        data = json.load(f)
-        player_data = data[user_id]
+        if not SessionManager.start_session(user_id, "shop"):
+            await interaction.response.send_message(
+                "You are already in a session!", 
+                ephemeral=True
+            )
+            return
 
-    shop_system = ShopSystem(player_data)
-    await shop_system.show_shop(interaction)
+        player_data = characters.get(user_id)
 
-@bot.tree.command(name="combat", description="Enter combat with a monster")
-async def combat(interaction: discord.Interaction):
-    user_id = str(interaction.user.id)
-    
-    if not Utils.user_has_character(user_id):
-        await interaction.response.send_message("Create a character first!", ephemeral=True)
-        return
+        shop_system = ShopSystem(player_data)
+        SessionManager.attach(user_id, shop_system)
+        await shop_system.show_shop(interaction)
+        return shop_system
+    finally:
+        SessionManager.release(user_id)
 
-    current_session = SessionManager.get_session(user_id)
-    if current_session:
-        await interaction.response.send_message(
-            f"You are currently in a {current_session} session. Complete or exit it first!", 
-            ephemeral=True
-        )
+@discord.app_commands.command(name="combat", description="Enter combat with a monster")
+@discord.app_commands.describe(auto="Resolve each fight instantly and show only the result")
+async def combat(interaction: discord.Interaction, auto: bool = False):
+    combat_system = await open_combat(interaction, auto)
+    if combat_system is None:
         return
+    if combat_system.in_fight:
+        await combat_system.run_combat_loop(interaction)
+    else:
+        await combat_system.bind_message(interaction)
 
-    if not SessionManager.start_session(user_id, "combat"):
-        await interaction.response.send_message(
-            "You are already in a session!", 
-            ephemeral=True
-        )
+@metrics.timed(COMMAND_SECONDS, 'combat')
+@profiler.profiled('combat')
+async def open_combat(interaction, auto):
+    user_id = str(interaction.user.id)
+
+    if not await SessionManager.claim(user_id):
+        await interaction.response.send_message(BUSY_MESSAGE, ephemeral=True)
         return
 
-    with open(DBFILE, 'r') as f:
-        data = json.load(f)
-        player_data = data[user_id]
+    try:
+        if not Utils.user_has_character(user_id):
+            await interaction.response.send_message("Create a character first!", ephemeral=True)
+            return
+
+        current_session = SessionManager.get_session(user_id)
+        if current_session:
+            await interaction.response.send_message(
+                f"You are currently in a {current_session} session. Complete or exit it first!", 
+                ephemeral=True
+            )
+            return
+
+        if not SessionManager.start_session(user_id, "combat"):
+            await interaction.response.send_message(
+                "You are already in a session!", 
+                ephemeral=True
+            )
+            return
+
+        player_data = characters.get(user_id)
 
-    combat_system = CombatSystem(player_data)
-    await combat_system.start_combat(interaction)
+        combat_system = CombatSystem(player_data, auto_resolve=auto)
+        SessionManager.attach(user_id, combat_system)
+        await combat_system.open_fight(interaction)
+        return combat_system
+    finally:
+        SessionManager.release(user_id)
 
-@bot.tree.command(name="create_character", description="Create a new character")
+@discord.app_commands.command(name="create_character", description="Create a new character")
+@metrics.timed(COMMAND_SECONDS, 'create_character')
+@profiler.profiled('create_character')
 async def create_character(interaction: discord.Interaction):
     await interaction.response.send_modal(CharacterCreateModal())
 
-@bot.tree.command(name="profile", description="Display your character profile")
+@discord.app_commands.command(name="profile", description="Display your character profile")
+@metrics.timed(COMMAND_SECONDS, 'profile')
+@profiler.profiled('profile')
 async def profile(interaction: discord.Interaction):
     user_id = str(interaction.user.id)
+    await characters.reload(user_id)
     if not Utils.user_has_character(user_id):
         await interaction.response.send_message("No profile found. Please create a character first.", ephemeral=True)
         return
 
-    with open(DBFILE, 'r') as f:
-        data = json.load(f)
-
-    char_data = data.get(user_id)
+    char_data = characters.get(user_id)
     if not char_data:
         await interaction.response.send_message("Your character has died and all data is lost.", ephemeral=True)
         return
 
-    embed = discord.Embed(title=f"{char_data['name']}'s Profile", color=discord.Color.blue())
-    embed.add_field(name="Level", value=char_data['level'], inline=True)
-    embed.add_field(name="HP", value=f"{char_data['current_hp']}/{char_data['max_hp']}", inline=True)
-    embed.add_field(name="EXP", value=char_data['current_exp'], inline=True)
-    embed.add_field(name="Attack", value=char_data['atk'], inline=True)
-    embed.add_field(name="Defense", value=char_data['def'], inline=True)
-    embed.add_field(name="Evasion", value=char_data['eva'], inline=True)
-    embed.add_field(name="Luck", value=char_data['luk'], inline=True)
-    embed.add_field(name="Coins", value=char_data['coins'], inline=True)
-    
-    pots = "\n".join([f"{pot}: {quantity}" for pot, quantity in char_data['pots'].items()])
-    embed.add_field(name="Potions", value=pots if pots else "None", inline=False)
-
-    embed.set_thumbnail(url=interaction.user.avatar.url)
-    embed.set_footer(text="Character Profile")
+    embed = Utils.create_profile_embed(char_data, interaction.user.avatar.url)
 
     await interaction.response.send_message(
         embed=embed,
         view=ProfileButtons(char_data)
     )
 
-@bot.tree.command(name="rankings", description="View the top 10 players")
+@discord.app_commands.command(name="rankings", description="View the top 10 players")
+@metrics.timed(COMMAND_SECONDS, 'rankings')
+@profiler.profiled('rankings')
 async def rankings(interaction: discord.Interaction):
-    scores = HighScoreSystem.get_rankings()
-    
+    await HighScoreSystem.refresh()
+    await interaction.response.send_message(embed=HighScoreSystem.get_rankings_embed())
+
+@discord.app_commands.command(name="leaderboard", description="View the strongest living characters")
+@metrics.timed(COMMAND_SECONDS, 'leaderboard')
+@profiler.profiled('leaderboard')
+async def leaderboard(interaction: discord.Interaction):
+    await interaction.response.defer()
+    try:
+        board = await LivingLeaderboard.get()
+    except Exception as e:
+        print(f"Error recomputing leaderboard: {e}")
+        await interaction.followup.send("The leaderboard is unavailable right now, try again later.", ephemeral=True)
+        return
+    await interaction.followup.send(embed=LivingLeaderboard.create_embed(board))
+
+SIMULATE_COOLDOWN = float(os.getenv('SIMULATE_COOLDOWN', '60'))
+MAX_SIMULATED_FIGHTS = int(os.getenv('MAX_SIMULATED_FIGHTS', '100000'))
+running_simulations = set()
+
+@discord.app_commands.command(name="simulate", description="Simulate fights against monsters at your level")
+@discord.app_commands.describe(fights=f"Number of fights to simulate (1-{MAX_SIMULATED_FIGHTS})")
+@discord.app_commands.checks.cooldown(1, SIMULATE_COOLDOWN, key=lambda interaction: interaction.user.id)
+@metrics.timed(COMMAND_SECONDS, 'simulate')
+@profiler.profiled('simulate')
+async def simulate(interaction: discord.Interaction, fights: int = 1000):
+    user_id = str(interaction.user.id)
+    player = characters.get(user_id)
+    if not player:
+        await interaction.response.send_message("No character found. Please create one first.", ephemeral=True)
+        return
+    if user_id in running_simulations:
+        await interaction.response.send_message("Your last simulation is still running.", ephemeral=True)
+        return
+
+    fights = max(1, min(MAX_SIMULATED_FIGHTS, fights))
+    running_simulations.add(user_id)
+    try:
+        await interaction.response.defer(ephemeral=True)
+        result = await jobs.simulate_fights(player, fights)
+    except Exception as e:
+        print(f"Error simulating fights for {user_id}: {e}")
+        await interaction.followup.send("The simulation failed, try again later.", ephemeral=True)
+        return
+    finally:
+        running_simulations.discard(user_id)
+
     embed = discord.Embed(
-        title="🏆 Hall of Champions 🏆",
-        description="The greatest warriors who have fallen in battle",
-        color=discord.Color.gold()
+        title=f"🎲 {player.name}: {result['fights']} simulated fights",
+        description="Each fight starts from your current HP and stats, without potions",
+        color=discord.Color.blue()
     )
-    
-    separator = "═══════════════════════"
-    
-    if not scores:
-        embed.add_field(name="No Records", value="Be the first to join the ranks!", inline=False)
-    else:
-        medals = ["🥇", "🥈", "🥉"]
-        
-        for i, score in enumerate(scores, 1):
-            medal = medals[i-1] if i <= 3 else "🌟"
-            field_name = f"{medal} Rank #{i}"
-            field_value = (
-                f"**{score['discord_name']}**\n"
-                f"Character: `{score['char_name']}`\n"
-                f"Level: `{score['level']}`\n"
-                f"Date: `{score['date']}`\n"
-                f"{separator}"
-            )
-            embed.add_field(name=field_name, value=field_value, inline=False)
+    embed.add_field(name="Win Rate", value=f"{result['win_rate']:.1%}", inline=True)
+    embed.add_field(name="Avg Rounds", value=f"{result['avg_rounds']:.1f}", inline=True)
+    embed.add_field(name="Avg Damage Taken", value=f"{result['avg_damage_taken']:.1f}", inline=True)
+    embed.add_field(name="Avg EXP", value=f"{result['avg_exp']:.1f}", inline=True)
+    embed.add_field(name="Avg Coins", value=f"{result['avg_coins']:.1f}", inline=True)
+    await interaction.followup.send(embed=embed, ephemeral=True)
+
+@simulate.error
+async def simulate_error(interaction: discord.Interaction, error):
+    if isinstance(error, discord.app_commands.CommandOnCooldown):
+        await interaction.response.send_message(f"You can run another simulation in {error.retry_after:.0f}s.", ephemeral=True)
+
+@discord.app_commands.command(name="profiling", description="Control command profiling (bot owner only)")
+@discord.app_commands.describe(action="on, off, dump, reset or status")
+@discord.app_commands.choices(action=[
+    discord.app_commands.Choice(name=action, value=action) for action in ('on', 'off', 'dump', 'reset', 'status')
+])
+async def profiling(interaction: discord.Interaction, action: str = 'status'):
+    if not await bot.is_owner(interaction.user):
+        await interaction.response.send_message("Only the bot owner can control profiling.", ephemeral=True)
+        return
 
-    embed.set_footer(text="May their legends live forever")
-    await interaction.response.send_message(embed=embed)
+    lines = []
+    if action == 'on':
+        profiler.enabled = True
+    elif action == 'off':
+        profiler.enabled = False
+    elif action == 'dump':
+        paths = profiler.dump()
+        lines.append("Wrote " + (", ".join(paths) if paths else "nothing, no profiles captured yet"))
+    elif action == 'reset':
+        profiler.reset()
+
+    status = profiler.status()
+    lines.append(f"Profiling is {'on' if status['enabled'] else 'off'}, slow call threshold {status['slow_ms']:.0f}ms")
+    lines.append(f"Slow calls logged: {status['slow_calls']} ({profiler.slow_log})")
+    for name, count in sorted(status['calls'].items()):
+        lines.append(f"{name}: {count} calls")
+
+    await interaction.response.send_message("\n".join(lines), ephemeral=True)
+
+@discord.app_commands.command(name="jobs", description="Run or inspect background jobs (bot owner only)")
+@discord.app_commands.describe(action="compact, balance or status")
+@discord.app_commands.choices(action=[
+    discord.app_commands.Choice(name=action, value=action) for action in ('compact', 'balance', 'status')
+])
+async def run_jobs(interaction: discord.Interaction, action: str = 'status'):
+    if not await bot.is_owner(interaction.user):
+        await interaction.response.send_message("Only the bot owner can run background jobs.", ephemeral=True)
+        return
+
+    await interaction.response.defer(ephemeral=True)
+    lines = []
+    try:
+        if action == 'compact':
+            compacted = await jobs.compact_store(characters)
+            lines.append("Store compacted" if compacted else f"Nothing to compact for {type(characters.backend).__name__}")
+        elif action == 'balance':
+            started = time.perf_counter()
+            cells = await jobs.balance_table(range(1, 11), 2000)
+            worst = min(cells, key=lambda cell: cell['win_rate'])
+            lines.append(f"Simulated {len(cells)} cells in {time.perf_counter() - started:.1f}s")
+            lines.append(f"Hardest matchup: Lv.{worst['level']} vs {worst['monster']}, {worst['win_rate']:.1%} win rate")
+    except Exception as e:
+        lines.append(f"Job failed: {type(e).__name__}: {e}")
+
+    status = jobs.runner.status()
+    lines.append(f"Job pool: {status['workers']} workers, {status['running']} running, {'started' if status['started'] else 'idle'}")
+    await interaction.followup.send("\n".join(lines), ephemeral=True)
+
+async def setup_hook():
+    try:
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, lambda: asyncio.create_task(bot.close()))
+    except NotImplementedError:
+        pass
+    await web_server.start()
 
-@bot.event
 async def on_ready():
-    print(f'Logged in as {bot.user}')
-    await bot.tree.sync()
+    print(f'Logged in as {bot.user} (cluster {cluster.CLUSTER_ID}, shards {getattr(bot, "shard_ids", None) or [0]})')
+    characters.start()
+    loop_lag_monitor.start()
+    SessionManager.start_reaper()
+    if cluster.CLUSTER_ID == 0:
+        await bot.tree.sync()
+
+COMMANDS = (shop, combat, create_character, profile, rankings, leaderboard, simulate, profiling, run_jobs)
+
+def create_bot():
+    intents = discord.Intents.default()
+    intents.messages = True
+    intents.message_content = True
+    if cluster.SHARD_IDS is not None:
+        client = commands.AutoShardedBot(command_prefix='/', intents=intents, shard_ids=cluster.SHARD_IDS, shard_count=cluster.SHARD_COUNT)
+    else:
+        client = commands.Bot(command_prefix='/', intents=intents)
+    for command in COMMANDS:
+        client.tree.add_command(command)
+    client.event(setup_hook)
+    client.event(on_ready)
+    return client
+
+async def serve(token):
+    async with bot:
+        try:
+            await bot.start(token)
+        finally:
+            await web_server.stop()
 
 def run_bot():
-    load_dotenv()
+    global bot, characters, web_server
+    characters = CharacterRepository(owner=cluster.lease_owner())
+    if cluster.SHARD_IDS is not None and not characters.shared:
+        print("Running as a cluster needs a storage backend shared between processes, set STORAGE_BACKEND=sqlite")
+        return
+    bot = create_bot()
+    web_server = WebServer(bot, characters)
+    characters.load()
+    HighScoreSystem.load(characters.load_scores(HighScoreSystem.LIMIT))
     token = os.getenv('DISCORD_BOT_TOKEN')
-    bot.run(token)
-
-run_bot()
\ No newline at end of file
+    discord.utils.setup_logging()
+    try:
+        asyncio.run(serve(token))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGTERM, signal.SIG_IGN)
+        jobs.runner.shutdown()
+        replays.writer.close()
+        characters.close()
+        profiler.close()
+        if profiler.stats:
+            profiler.dump()
+
+if __name__ == '__main__':
+    run_bot()
\ No newline at end of file
@@ -0,0 +1,209 @@
+import time
+import functools
+import asyncio
+import threading
+from bisect import bisect_left
+from collections import deque
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+def _format_value(value):
+    if value == float('inf'):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+
+    def register(self, metric):
+        if metric.name in self.metrics:
+            raise ValueError(f"Metric already registered: {metric.name}")
+        self.metrics[metric.name] = metric
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in list(self.metrics.values()):
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+REGISTRY = Registry()
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, help, labels=(), registry=REGISTRY):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.values = {}
+        self._lock = threading.Lock()
+        registry.register(self)
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def get(self, *label_values):
+        return self.values.get(label_values, 0)
+
+    def render(self):
+        return [f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}" for key, value in list(self.values.items())]
+
+class Gauge:
+    kind = 'gauge'
+
+    def __init__(self, name, help, labels=(), callback=None, registry=REGISTRY):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.callback = callback
+        self.values = {}
+        registry.register(self)
+
+    def set(self, value, *label_values):
+        self.values[label_values] = value
+
+    def collect(self):
+        if self.callback is None:
+            return list(self.values.items())
+        value = self.callback()
+        if isinstance(value, dict):
+            return list(value.items())
+        return [((), value)]
+
+    def render(self):
+        return [f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}" for key, value in self.collect()]
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS, registry=REGISTRY):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self.series = {}
+        self._lock = threading.Lock()
+        registry.register(self)
+
+    def observe(self, value, *label_values):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self.series.get(label_values)
+            if series is None:
+                series = self.series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def time(self, *label_values):
+        return _Timer(self, label_values)
+
+    def render(self):
+        lines = []
+        with self._lock:
+            series = [(key, list(counts), total, count) for key, (counts, total, count) in self.series.items()]
+        for key, counts, total, count in series:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, ('le', _format_value(bound)))} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {count}")
+        return lines
+
+class _Timer:
+    def __init__(self, histogram, label_values):
+        self.histogram = histogram
+        self.label_values = label_values
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.histogram.observe(time.perf_counter() - self.start, *self.label_values)
+
+class RateMeter:
+    kind = 'gauge'
+
+    def __init__(self, name, help, window=60, registry=REGISTRY):
+        self.name = name
+        self.help = help
+        self.window = window
+        self._seconds = deque()
+        self._lock = threading.Lock()
+        registry.register(self)
+
+    def _trim(self, now):
+        while self._seconds and self._seconds[0][0] <= now - self.window:
+            self._seconds.popleft()
+
+    def mark(self, amount=1):
+        now = int(time.monotonic())
+        with self._lock:
+            if self._seconds and self._seconds[-1][0] == now:
+                self._seconds[-1][1] += amount
+            else:
+                self._seconds.append([now, amount])
+                self._trim(now)
+
+    def rate(self):
+        now = int(time.monotonic())
+        with self._lock:
+            self._trim(now)
+            return sum(count for _, count in self._seconds) / self.window
+
+    def render(self):
+        return [f"{self.name} {_format_value(self.rate())}"]
+
+class LoopLagMonitor:
+    def __init__(self, gauge, histogram, interval=0.5):
+        self.gauge = gauge
+        self.histogram = histogram
+        self.interval = interval
+        self._task = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.perf_counter() - start - self.interval)
+            self.gauge.set(lag)
+            self.histogram.observe(lag)
+
+def timed(histogram, *label_values):
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - start, *label_values)
+        return wrapper
+    return decorator
@@ -0,0 +1,83 @@
+STATS = ('atk', 'def', 'eva', 'luk')
+STAT_ATTRS = {'atk': 'atk', 'def': 'def_', 'eva': 'eva', 'luk': 'luk'}
+
+def format_stat(value):
+    return f"{value:g}"
+
+def stored_stat(value):
+    return int(value) if value.is_integer() else value
+
+class Character:
+    __slots__ = ('user_id', 'name', 'atk', 'def_', 'eva', 'luk', 'level', 'coins', 'pots', 'current_hp', 'max_hp', 'current_exp')
+
+    def __init__(self, user_id, name, atk, def_, eva, luk, level=1, coins=0, pots=None, current_hp=100, max_hp=100, current_exp=0):
+        self.user_id = str(user_id)
+        self.name = str(name)
+        self.atk = float(atk)
+        self.def_ = float(def_)
+        self.eva = float(eva)
+        self.luk = float(luk)
+        self.level = int(level)
+        self.coins = int(coins)
+        self.pots = {str(pot): int(amount) for pot, amount in (pots or {}).items()}
+        self.current_hp = int(current_hp)
+        self.max_hp = int(max_hp)
+        self.current_exp = int(current_exp)
+
+    def stat(self, stat):
+        return getattr(self, STAT_ATTRS[stat])
+
+    def set_stat(self, stat, value):
+        setattr(self, STAT_ATTRS[stat], float(value))
+
+    def stats(self):
+        return {stat: getattr(self, attr) for stat, attr in STAT_ATTRS.items()}
+
+    def validate(self):
+        if not self.user_id or not self.name:
+            raise ValueError("user_id and name are required")
+        if self.level < 1:
+            raise ValueError(f"level must be at least 1, got {self.level}")
+        if self.max_hp < 1 or not 0 <= self.current_hp <= self.max_hp:
+            raise ValueError(f"hp {self.current_hp}/{self.max_hp} is out of range")
+        if self.coins < 0 or self.current_exp < 0:
+            raise ValueError("coins and exp cannot be negative")
+        if any(amount < 0 for amount in self.pots.values()):
+            raise ValueError("potion counts cannot be negative")
+        return self
+
+    def to_dict(self):
+        return {
+            'user_id': self.user_id,
+            'name': self.name,
+            'atk': stored_stat(self.atk),
+            'def': stored_stat(self.def_),
+            'eva': stored_stat(self.eva),
+            'luk': stored_stat(self.luk),
+            'level': self.level,
+            'coins': self.coins,
+            'pots': dict(self.pots),
+            'current_hp': self.current_hp,
+            'max_hp': self.max_hp,
+            'current_exp': self.current_exp
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        try:
+            return cls(
+                data['user_id'], data['name'], data['atk'], data['def'], data['eva'], data['luk'],
+                data.get('level', 1), data.get('coins', 0), data.get('pots'),
+                data.get('current_hp', 100), data.get('max_hp', 100), data.get('current_exp', 0)
+            ).validate()
+        except KeyError as e:
+            raise ValueError(f"missing field {e.args[0]}") from None
+        except (TypeError, AttributeError) as e:
+            raise ValueError(str(e)) from None
+
+    def copy(self):
+        clone = object.__new__(Character)
+        for slot in Character.__slots__:
+            setattr(clone, slot, getattr(self, slot))
+        clone.pots = dict(self.pots)
+        return clone
@@ -0,0 +1,163 @@
+import os
+import io
+import time
+import pstats
+import cProfile
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+PROFILE_ENABLED = os.getenv('PROFILE_ENABLED', '0') == '1'
+PROFILE_DIR = os.getenv('PROFILE_DIR', 'profiles')
+SLOW_CALL_MS = float(os.getenv('SLOW_CALL_MS', '250'))
+SLOW_CALL_LOG = os.getenv('SLOW_CALL_LOG', 'slow_calls.log')
+SLOW_CALL_TOP = 10
+
+class _Capture:
+    def __init__(self, profiler):
+        self.profiler = profiler
+        self.profile = cProfile.Profile()
+        self.on_loop = 0.0
+        self.started = time.perf_counter()
+
+    def __enter__(self):
+        self.entered = not self.profiler._active
+        if self.entered:
+            self.profiler._active = True
+            self.profile.enable()
+        self.slice_start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.on_loop += time.perf_counter() - self.slice_start
+        if self.entered:
+            self.profile.disable()
+            self.profiler._active = False
+
+class _ProfiledCoroutine:
+    def __init__(self, coro, capture):
+        self.coro = coro
+        self.capture = capture
+
+    def __await__(self):
+        value = None
+        error = None
+        while True:
+            with self.capture:
+                try:
+                    if error is not None:
+                        yielded = self.coro.throw(error)
+                    else:
+                        yielded = self.coro.send(value)
+                except StopIteration as e:
+                    return e.value
+            try:
+                value = yield yielded
+                error = None
+            except BaseException as e:
+                value = None
+                error = e
+
+class Profiler:
+    def __init__(self, enabled=PROFILE_ENABLED, directory=PROFILE_DIR, slow_ms=SLOW_CALL_MS, slow_log=SLOW_CALL_LOG):
+        self.enabled = enabled
+        self.directory = directory
+        self.slow_ms = slow_ms
+        self.slow_log = slow_log
+        self.stats = {}
+        self.calls = {}
+        self.slow_calls = 0
+        self._active = False
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='profiler')
+
+    async def run(self, name, func, *args, **kwargs):
+        if not self.enabled:
+            return await func(*args, **kwargs)
+
+        capture = _Capture(self)
+        try:
+            return await _ProfiledCoroutine(func(*args, **kwargs), capture)
+        finally:
+            self._finish(name, capture)
+
+    def run_sync(self, name, func, *args, **kwargs):
+        if not self.enabled:
+            return func(*args, **kwargs)
+
+        capture = _Capture(self)
+        try:
+            with capture:
+                return func(*args, **kwargs)
+        finally:
+            self._finish(name, capture)
+
+    def profiled(self, name):
+        def decorator(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                return await self.run(name, func, *args, **kwargs)
+            return wrapper
+        return decorator
+
+    def _finish(self, name, capture):
+        elapsed = time.perf_counter() - capture.started
+        self.calls[name] = self.calls.get(name, 0) + 1
+
+        stats = None
+        if capture.profile.getstats():
+            stats = pstats.Stats(capture.profile)
+            if name in self.stats:
+                self.stats[name].add(stats)
+            else:
+                self.stats[name] = pstats.Stats(capture.profile)
+
+        if elapsed * 1000 >= self.slow_ms:
+            self._log_slow(name, elapsed, capture.on_loop, stats)
+
+    def _log_slow(self, name, elapsed, on_loop, stats):
+        self.slow_calls += 1
+        header = (
+            f"{time.strftime('%Y-%m-%d %H:%M:%S')} {name}: {elapsed * 1000:.1f}ms wall, "
+            f"{on_loop * 1000:.1f}ms on the event loop, {(elapsed - on_loop) * 1000:.1f}ms awaiting"
+        )
+        self._writer.submit(self._write_slow, header, stats)
+
+    def _write_slow(self, header, stats):
+        lines = [header]
+        if stats is not None:
+            out = io.StringIO()
+            stats.stream = out
+            stats.sort_stats('cumulative').print_stats(SLOW_CALL_TOP)
+            lines.extend(f"    {line}" for line in out.getvalue().strip().splitlines())
+
+        try:
+            with open(self.slow_log, 'a', encoding='utf-8') as f:
+                f.write("\n".join(lines) + "\n")
+        except OSError as e:
+            print(f"Error writing slow call log: {e}")
+
+    def close(self):
+        self._writer.shutdown(wait=True)
+
+    def dump(self):
+        os.makedirs(self.directory, exist_ok=True)
+        paths = []
+        for name, stats in self.stats.items():
+            path = os.path.join(self.directory, f"{name}.prof")
+            stats.dump_stats(path)
+            paths.append(path)
+        return paths
+
+    def reset(self):
+        self.stats.clear()
+        self.calls.clear()
+        self.slow_calls = 0
+
+    def status(self):
+        return {
+            'enabled': self.enabled,
+            'slow_ms': self.slow_ms,
+            'slow_calls': self.slow_calls,
+            'calls': dict(self.calls)
+        }
+
+profiler = Profiler()
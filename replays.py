@@ -0,0 +1,163 @@
+import os
+import json
+import time
+import random
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import combat_engine
+from models import Character, STAT_ATTRS
+
+REPLAY_FILE = os.getenv('REPLAY_FILE', 'replays.jsonl')
+RESULT_FIELDS = ('level', 'current_exp', 'current_hp', 'coins', 'atk', 'def', 'eva', 'luk')
+
+def new_seed():
+    return random.SystemRandom().getrandbits(64)
+
+def summarize(player):
+    return {field: getattr(player, STAT_ATTRS.get(field, field)) for field in RESULT_FIELDS}
+
+class ReplayRecorder:
+    def __init__(self, player, seed):
+        self.seed = seed
+        self.user_id = player.user_id
+        self.start = player.to_dict()
+        self.actions = []
+        self.settle(player)
+
+    def settle(self, player):
+        self.hp = player.current_hp
+        self.pots = dict(player.pots)
+
+    def sync(self, player):
+        if player.current_hp != self.hp or player.pots != self.pots:
+            self.actions.append(['s', player.current_hp, dict(player.pots)])
+            self.settle(player)
+
+    def fight(self, player, auto=False):
+        self.sync(player)
+        self.actions.append('a' if auto else 'f')
+
+    def potion(self, player, pot_name):
+        self.actions.append(['p', pot_name])
+        self.settle(player)
+
+    def to_record(self, player):
+        return {
+            'seed': self.seed,
+            'user_id': self.user_id,
+            'date': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'player': self.start,
+            'actions': self.actions,
+            'result': summarize(player)
+        }
+
+def append_replay(record, path=REPLAY_FILE):
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(record, separators=(',', ':')) + '\n')
+
+class ReplayWriter:
+    def __init__(self):
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='replays')
+
+    def save(self, record, path=REPLAY_FILE):
+        future = self._executor.submit(append_replay, record, path)
+        future.add_done_callback(self._report)
+        return future
+
+    @staticmethod
+    def _report(future):
+        if not future.cancelled() and future.exception() is not None:
+            print(f"Error saving replay: {future.exception()}")
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+writer = ReplayWriter()
+
+def load_replays(path=REPLAY_FILE):
+    replays = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                replays.append(json.loads(line))
+            except ValueError:
+                print(f"Skipping malformed replay line in {path}")
+    return replays
+
+def replay(record, log=None):
+    rng = random.Random(record['seed'])
+    player = Character.from_dict(record['player'])
+    effects = {}
+    next_monster = combat_engine.generate_monster(player.level, rng)
+    fights = 0
+    rounds = 0
+
+    for action in record['actions']:
+        if action in ('f', 'a'):
+            monster = next_monster
+            next_monster = combat_engine.generate_monster(player.level, rng)
+            result = combat_engine.resolve_fight(player, monster, effects, rng, log)
+            fights += 1
+            rounds += result['rounds']
+            if log is not None:
+                log.append(f"-- fight {fights}: {monster.name} -> {result['outcome']} in {result['rounds']} rounds")
+            if result['outcome'] != 'victory':
+                break
+        elif action[0] == 'p':
+            combat_engine.apply_potion(player, effects, action[1], log)
+        elif action[0] == 's':
+            player.current_hp = action[1]
+            player.pots = dict(action[2])
+
+    return {
+        'player': player,
+        'fights': fights,
+        'rounds': rounds,
+        'matches': summarize(player) == record.get('result')
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-simulate recorded combat sessions without Discord")
+    parser.add_argument('path', nargs='?', default=REPLAY_FILE)
+    parser.add_argument('--user', help="Only replay sessions for this user id")
+    parser.add_argument('--index', type=int, help="Replay a single session and print its combat log")
+    parser.add_argument('--repeat', type=int, default=1, help="Replay the corpus this many times for throughput")
+    args = parser.parse_args()
+
+    records = load_replays(args.path)
+    if args.user:
+        records = [record for record in records if record['user_id'] == args.user]
+
+    if args.index is not None:
+        log = []
+        outcome = replay(records[args.index], log)
+        print("\n".join(log))
+        print(f"Expected: {records[args.index].get('result')}")
+        print(f"Replayed: {summarize(outcome['player'])}")
+        print("Match" if outcome['matches'] else "MISMATCH")
+        return
+
+    mismatches = [index for index, record in enumerate(records) if not replay(record)['matches']]
+
+    fights = 0
+    rounds = 0
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        for record in records:
+            outcome = replay(record)
+            fights += outcome['fights']
+            rounds += outcome['rounds']
+    elapsed = time.perf_counter() - start
+
+    print(f"Replayed {len(records)} sessions x{args.repeat}: {fights} fights, {rounds} rounds in {elapsed:.3f}s")
+    if elapsed > 0:
+        print(f"{fights / elapsed:,.0f} fights/s, {rounds / elapsed:,.0f} rounds/s")
+    print(f"{len(records) - len(mismatches)}/{len(records)} sessions reproduced their recorded result")
+    for index in mismatches:
+        print(f"  mismatch: #{index} user {records[index]['user_id']} seed {records[index]['seed']}")
+
+if __name__ == '__main__':
+    main()
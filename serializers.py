@@ -0,0 +1,42 @@
+import os
+import json
+import marshal
+
+class JsonSerializer:
+    binary = False
+
+    def __init__(self, indent=None):
+        self.indent = indent
+        self.separators = None if indent is not None else (',', ':')
+
+    def dumps(self, obj):
+        return json.dumps(obj, indent=self.indent, separators=self.separators).encode()
+
+    def loads(self, data):
+        return json.loads(data)
+
+class MarshalSerializer:
+    binary = True
+
+    def dumps(self, obj):
+        return marshal.dumps(obj)
+
+    def loads(self, data):
+        return marshal.loads(data)
+
+SERIALIZERS = {
+    'pretty': JsonSerializer(indent=4),
+    'compact': JsonSerializer(),
+    'binary': MarshalSerializer()
+}
+
+STORAGE_SERIALIZER = os.getenv('STORAGE_SERIALIZER', 'compact')
+
+def serializer_name(serializer):
+    return next((name for name, value in SERIALIZERS.items() if value is serializer), type(serializer).__name__)
+
+def get_serializer(name=STORAGE_SERIALIZER):
+    try:
+        return SERIALIZERS[name]
+    except KeyError:
+        raise ValueError(f"Unknown serializer: {name}") from None
@@ -0,0 +1,152 @@
+import json
+import argparse
+import combat_engine
+from combat_engine import Monster, LEVEL_UP_STATS
+
+try:
+    import numpy as np
+except ImportError:
+    raise ImportError("simulator.py requires numpy: pip install numpy") from None
+
+DEFAULT_BUILD = {'atk': 7, 'def': 6, 'eva': 6, 'luk': 6}
+BATCH_SIZE = 250000
+
+def player_at_level(level, build=DEFAULT_BUILD, hp=100):
+    player = {'level': level, 'current_hp': hp, 'max_hp': 100}
+    for stat, base in build.items():
+        player[stat] = round(base + LEVEL_UP_STATS[stat] * (level - 1), 1)
+    return player
+
+def monster_table(player_level, monster_type, offsets=None):
+    levels, weights = combat_engine.spawn_level_weights(player_level)
+    if offsets is not None:
+        picked = [(level, weight) for level, weight in zip(levels, weights) if level - player_level in offsets]
+        levels = [level for level, _ in picked]
+        weights = [weight for _, weight in picked]
+
+    stats = [
+        combat_engine.scale_to_player(*combat_engine.monster_stats(monster_type, level), level - player_level)
+        for level in levels
+    ]
+    exp = [combat_engine.calculate_exp_gain(player_level, level) for level in levels]
+
+    probabilities = np.array(weights, dtype=np.float64)
+    probabilities /= probabilities.sum()
+    return {
+        'levels': np.array(levels),
+        'probabilities': probabilities,
+        'hp': np.array([hp for hp, _, _ in stats]),
+        'atk': np.array([atk for _, atk, _ in stats]),
+        'def': np.array([def_ for _, _, def_ in stats]),
+        'exp': np.array(exp)
+    }
+
+def roll_damage(rng, base, size):
+    return np.maximum(1, np.trunc(base * rng.uniform(0.8, 1.2, size)))
+
+def simulate_batch(rng, player, table, size, max_rounds=1000):
+    pick = rng.choice(len(table['levels']), size=size, p=table['probabilities'])
+    monster_hp = table['hp'][pick].astype(np.float64)
+    monster_atk = table['atk'][pick]
+    monster_def = table['def'][pick]
+
+    player_hp = np.full(size, float(player['current_hp']))
+    rounds = np.zeros(size, dtype=np.int64)
+    active = np.arange(size)
+
+    crit_chance = min(0.25, player['luk'] * 0.01)
+    evade_chance = min(0.75, player['eva'] * 0.015)
+
+    for _ in range(max_rounds):
+        if active.size == 0:
+            break
+        n = active.size
+
+        damage = roll_damage(rng, player['atk'] - monster_def[active] * 0.5, n)
+        crits = rng.random(n) < crit_chance
+        damage[crits] = np.trunc(damage[crits] * 1.5)
+        monster_hp[active] = np.maximum(0, monster_hp[active] - damage)
+
+        striking = active[monster_hp[active] > 0]
+        m = striking.size
+        damage = roll_damage(rng, monster_atk[striking] - player['def'] * 0.5, m)
+        hits = rng.random(m) <= 1 - evade_chance
+        crits = rng.random(m) < 0.10
+        damage = np.where(crits, np.trunc(damage * 1.5), damage)
+        player_hp[striking] = np.where(hits, np.maximum(0, player_hp[striking] - damage), player_hp[striking])
+
+        rounds[active] += 1
+        active = active[(player_hp[active] > 0) & (monster_hp[active] > 0)]
+
+    wins = (player_hp > 0) & (monster_hp <= 0)
+
+    coin_chance = 0.3 + player['luk'] * 0.008
+    coins = np.where(
+        wins & (rng.random(size) < coin_chance),
+        rng.integers(20, 51, size) + int(player['luk'] * 0.3),
+        0
+    )
+
+    return {
+        'wins': int(wins.sum()),
+        'rounds': int(rounds.sum()),
+        'hp_lost': float((player['current_hp'] - player_hp).sum()),
+        'exp': int(np.where(wins, table['exp'][pick], 0).sum()),
+        'coins': int(coins.sum())
+    }
+
+def simulate_cell(player_level, monster_type, fights, seed=0, build=DEFAULT_BUILD, hp=100, offsets=None):
+    rng = np.random.default_rng(seed)
+    player = player_at_level(player_level, build, hp)
+    table = monster_table(player_level, monster_type, offsets)
+
+    totals = {'wins': 0, 'rounds': 0, 'hp_lost': 0.0, 'exp': 0, 'coins': 0}
+    remaining = fights
+    while remaining > 0:
+        size = min(BATCH_SIZE, remaining)
+        for key, value in simulate_batch(rng, player, table, size).items():
+            totals[key] += value
+        remaining -= size
+
+    return {
+        'level': player_level,
+        'monster': monster_type,
+        'fights': fights,
+        'win_rate': totals['wins'] / fights,
+        'expected_rounds': totals['rounds'] / fights,
+        'expected_hp_loss': totals['hp_lost'] / fights,
+        'expected_exp': totals['exp'] / fights,
+        'expected_coins': totals['coins'] / fights
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Monte Carlo balance tables for player level x monster type")
+    parser.add_argument('--levels', type=int, nargs='+', default=list(range(1, 11)))
+    parser.add_argument('--monsters', nargs='+', default=list(Monster.MONSTER_TYPES), choices=list(Monster.MONSTER_TYPES))
+    parser.add_argument('--fights', type=int, default=1000000, help="Fights per cell")
+    parser.add_argument('--offsets', type=int, nargs='+', help="Only spawn monsters at these level offsets, e.g. 2")
+    parser.add_argument('--build', type=int, nargs=4, metavar=('ATK', 'DEF', 'EVA', 'LUK'),
+                        default=[DEFAULT_BUILD[stat] for stat in ('atk', 'def', 'eva', 'luk')])
+    parser.add_argument('--hp', type=int, default=100, help="Player HP at the start of each fight")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="Write the table as JSON to this path")
+    args = parser.parse_args()
+
+    build = dict(zip(('atk', 'def', 'eva', 'luk'), args.build))
+    rows = []
+    print(f"{'lvl':>4} {'monster':<8} {'win%':>7} {'rounds':>7} {'hp loss':>8} {'exp':>7} {'coins':>7}")
+    for level in args.levels:
+        for index, monster_type in enumerate(args.monsters):
+            row = simulate_cell(level, monster_type, args.fights, args.seed + level * 100 + index, build, args.hp, args.offsets)
+            rows.append(row)
+            print(
+                f"{level:>4} {monster_type:<8} {row['win_rate'] * 100:>6.2f}% {row['expected_rounds']:>7.2f} "
+                f"{row['expected_hp_loss']:>8.2f} {row['expected_exp']:>7.2f} {row['expected_coins']:>7.2f}"
+            )
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(rows, f, indent=4)
+
+if __name__ == '__main__':
+    main()
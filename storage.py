@@ -0,0 +1,900 @@
+import os
+import time
+import struct
+import sqlite3
+import asyncio
+import argparse
+import hashlib
+import socket
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from serializers import SERIALIZERS, STORAGE_SERIALIZER, get_serializer, serializer_name
+import metrics
+from models import Character
+
+DBFILE = 'database.json'
+HISCORE_FILE = 'hiscore.json'
+SQLITE_FILE = os.getenv('SQLITE_FILE', 'roguelike.db')
+SHARD_DIR = os.getenv('SHARD_DIR', 'characters')
+JOURNAL_FILE = os.getenv('JOURNAL_FILE', 'journal.jsonl')
+SNAPSHOT_FILE = os.getenv('SNAPSHOT_FILE', 'snapshot.json')
+JOURNAL_COMPACT_THRESHOLD = int(os.getenv('JOURNAL_COMPACT_THRESHOLD', '1000'))
+STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'json')
+FLUSH_INTERVAL = float(os.getenv('DB_FLUSH_INTERVAL', '5'))
+LEASE_TTL = float(os.getenv('LEASE_TTL', '180'))
+SQLITE_BUSY_TIMEOUT = int(os.getenv('SQLITE_BUSY_TIMEOUT', '5000'))
+HISCORE_LIMIT = 10
+
+DECODE_ERRORS = (ValueError, EOFError, TypeError)
+
+STORAGE_SECONDS = metrics.Histogram('roguelike_storage_seconds', "Time spent loading and committing character data", ('operation',))
+SAVES = metrics.Counter('roguelike_saves_total', "Character saves queued, by reason", ('reason',))
+LEASES = metrics.Counter('roguelike_lease_claims_total', "Cross-process character ownership claims, by result", ('result',))
+
+def atomic_write(path, data):
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=os.path.basename(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+def read_file(path):
+    try:
+        with open(path, 'rb') as f:
+            return f.read()
+    except FileNotFoundError:
+        return b''
+
+def decode(data, serializer, path):
+    try:
+        return serializer.loads(data)
+    except DECODE_ERRORS as e:
+        raise ValueError(
+            f"Cannot read {path} as {serializer_name(serializer)} data ({e}); "
+            f"if STORAGE_SERIALIZER changed, run: python storage.py convert --from <old> --to {serializer_name(serializer)}"
+        ) from None
+
+def read_scores(path, serializer, limit=HISCORE_LIMIT):
+    data = read_file(path)
+    if not data:
+        return []
+    return decode(data, serializer, path)[:limit]
+
+def append_scores(path, serializer, scores):
+    board = read_scores(path, serializer) + scores
+    board.sort(key=lambda x: x['level'], reverse=True)
+    atomic_write(path, serializer.dumps(board[:HISCORE_LIMIT]))
+
+def snapshot(char):
+    return {key: dict(value) if isinstance(value, dict) else value for key, value in char.items()}
+
+class JsonFileBackend:
+    def __init__(self, path=DBFILE, hiscore_path=HISCORE_FILE, serializer=None):
+        self.path = path
+        self.hiscore_path = hiscore_path
+        self.serializer = serializer or get_serializer()
+        self._mirror = {}
+
+    def load(self):
+        data = read_file(self.path)
+        if not data:
+            self._mirror = {}
+            return {}
+
+        self._mirror = decode(data, self.serializer, self.path)
+        return {user_id: snapshot(char) for user_id, char in self._mirror.items()}
+
+    def load_scores(self, limit=HISCORE_LIMIT):
+        return read_scores(self.hiscore_path, self.serializer, limit)
+
+    def reader_spec(self):
+        return 'json', {'path': self.path, 'hiscore_path': self.hiscore_path, 'serializer': self.serializer}
+
+    def commit(self, changed, deleted, scores, reasons=None):
+        if changed or deleted:
+            self._mirror.update(changed)
+            for user_id in deleted:
+                self._mirror.pop(user_id, None)
+            atomic_write(self.path, self.serializer.dumps(self._mirror))
+
+        if scores:
+            append_scores(self.hiscore_path, self.serializer, scores)
+
+class SqliteBackend:
+    shared = True
+
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS characters ("
+        "user_id TEXT PRIMARY KEY, "
+        "name_key TEXT, "
+        "data TEXT NOT NULL)",
+        "CREATE TABLE IF NOT EXISTS leaderboard ("
+        "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+        "user_id TEXT NOT NULL, "
+        "char_name TEXT NOT NULL, "
+        "level INTEGER NOT NULL, "
+        "discord_name TEXT NOT NULL, "
+        "date TEXT NOT NULL)",
+        "CREATE INDEX IF NOT EXISTS leaderboard_rank ON leaderboard (level DESC, id)",
+        "CREATE TABLE IF NOT EXISTS owners ("
+        "user_id TEXT PRIMARY KEY, "
+        "owner TEXT NOT NULL, "
+        "expires_at REAL NOT NULL)"
+    )
+
+    def __init__(self, path=SQLITE_FILE, serializer=None):
+        self.path = path
+        self.serializer = serializer or get_serializer()
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT}")
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        for statement in self.SCHEMA:
+            self.conn.execute(statement)
+        self._upgrade()
+
+    def _upgrade(self):
+        with self.transaction() as cur:
+            columns = [row[1] for row in cur.execute("PRAGMA table_info(characters)")]
+            if 'name_key' not in columns:
+                cur.execute("ALTER TABLE characters ADD COLUMN name_key TEXT")
+                rows = cur.execute("SELECT user_id, data FROM characters").fetchall()
+                cur.executemany(
+                    "UPDATE characters SET name_key = ? WHERE user_id = ?",
+                    [(decode(data, self.serializer, self.path)['name'].casefold(), user_id) for user_id, data in rows]
+                )
+            cur.execute("CREATE INDEX IF NOT EXISTS characters_name ON characters (name_key)")
+
+    def load(self):
+        with self.lock:
+            rows = self.conn.execute("SELECT user_id, data FROM characters").fetchall()
+        return {user_id: decode(data, self.serializer, self.path) for user_id, data in rows}
+
+    def load_one(self, user_id):
+        with self.lock:
+            row = self.conn.execute("SELECT data FROM characters WHERE user_id = ?", (user_id,)).fetchone()
+        return decode(row[0], self.serializer, self.path) if row else None
+
+    def find_name(self, name):
+        with self.lock:
+            row = self.conn.execute("SELECT user_id FROM characters WHERE name_key = ?", (name.casefold(),)).fetchone()
+        return row[0] if row else None
+
+    def load_scores(self, limit=HISCORE_LIMIT):
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT user_id, char_name, level, discord_name, date FROM leaderboard "
+                "ORDER BY level DESC, id LIMIT ?",
+                (limit,)
+            ).fetchall()
+        return [
+            {
+                'user_id': user_id,
+                'char_name': char_name,
+                'level': level,
+                'discord_name': discord_name,
+                'date': date
+            }
+            for user_id, char_name, level, discord_name, date in rows
+        ]
+
+    def commit(self, changed, deleted, scores, reasons=None):
+        rows = [(user_id, char['name'].casefold(), self.serializer.dumps(char)) for user_id, char in changed.items()]
+        with self.lock, self.transaction() as cur:
+            cur.executemany(
+                "INSERT INTO characters (user_id, name_key, data) VALUES (?, ?, ?) "
+                "ON CONFLICT(user_id) DO UPDATE SET name_key = excluded.name_key, data = excluded.data",
+                rows
+            )
+            cur.executemany(
+                "DELETE FROM characters WHERE user_id = ?",
+                [(user_id,) for user_id in deleted]
+            )
+            cur.executemany(
+                "INSERT INTO leaderboard (user_id, char_name, level, discord_name, date) "
+                "VALUES (:user_id, :char_name, :level, :discord_name, :date)",
+                scores
+            )
+
+    def claim(self, user_id, owner, ttl):
+        now = time.time()
+        with self.lock, self.transaction() as cur:
+            cur.execute(
+                "INSERT INTO owners (user_id, owner, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(user_id) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at "
+                "WHERE owners.owner = excluded.owner OR owners.expires_at < ?",
+                (user_id, owner, now + ttl, now)
+            )
+            return cur.rowcount > 0
+
+    def renew(self, user_ids, owner, ttl):
+        expires_at = time.time() + ttl
+        lost = []
+        with self.lock, self.transaction() as cur:
+            for user_id in user_ids:
+                cur.execute(
+                    "UPDATE owners SET expires_at = ? WHERE user_id = ? AND owner = ?",
+                    (expires_at, user_id, owner)
+                )
+                if cur.rowcount == 0:
+                    lost.append(user_id)
+        return lost
+
+    def release(self, user_ids, owner):
+        with self.lock, self.transaction() as cur:
+            cur.executemany(
+                "DELETE FROM owners WHERE user_id = ? AND owner = ?",
+                [(user_id, owner) for user_id in user_ids]
+            )
+
+    def release_owner(self, owner):
+        with self.lock, self.transaction() as cur:
+            cur.execute("DELETE FROM owners WHERE owner = ?", (owner,))
+            return cur.rowcount
+
+    def transaction(self):
+        return SqliteTransaction(self.conn)
+
+    def reader_spec(self):
+        return 'sqlite', {'path': self.path, 'serializer': self.serializer}
+
+    def vacuum(self):
+        with self.lock:
+            self.conn.execute("VACUUM")
+            self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def close(self):
+        self.conn.close()
+
+class SqliteTransaction:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.cur = self.conn.cursor()
+        self.cur.execute("BEGIN IMMEDIATE")
+        return self.cur
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.cur.execute("COMMIT")
+        else:
+            self.cur.execute("ROLLBACK")
+        self.cur.close()
+        return False
+
+class JournalBackend:
+    def __init__(self, journal_path=JOURNAL_FILE, snapshot_path=SNAPSHOT_FILE, compact_threshold=JOURNAL_COMPACT_THRESHOLD, serializer=None, repair=True):
+        self.journal_path = journal_path
+        self.snapshot_path = snapshot_path
+        self.compact_threshold = compact_threshold
+        self.repair = repair
+        self.serializer = serializer or get_serializer()
+        self.record_serializer = self.serializer if self.serializer.binary else SERIALIZERS['compact']
+        self._mirror = {}
+        self._scores = []
+        self._seq = 0
+        self._journal_records = 0
+
+    def load(self):
+        data = read_file(self.snapshot_path)
+        if data:
+            state = decode(data, self.serializer, self.snapshot_path)
+        else:
+            state = {'seq': 0, 'characters': {}, 'scores': []}
+
+        self._mirror = state['characters']
+        self._scores = state['scores']
+        self._seq = state['seq']
+        self._journal_records = 0
+        self._replay()
+
+        return {user_id: snapshot(char) for user_id, char in self._mirror.items()}
+
+    def _replay(self):
+        try:
+            f = open(self.journal_path, 'rb+' if self.repair else 'rb')
+        except FileNotFoundError:
+            return
+
+        with f:
+            offset = 0
+            buf = f.read()
+            if buf and (buf[:2] == b'{"') == self.record_serializer.binary:
+                raise ValueError(
+                    f"{self.journal_path} was written by another serializer; "
+                    f"run: python storage.py convert --backend journal --from <old> --to {serializer_name(self.serializer)}"
+                )
+            for record, offset in self._frames(buf):
+                self._journal_records += 1
+                if record['seq'] <= self._seq:
+                    continue
+                self._apply(record)
+                self._seq = record['seq']
+
+            if self.repair:
+                f.truncate(offset)
+
+    def _frame(self, record):
+        data = self.record_serializer.dumps(record)
+        if self.record_serializer.binary:
+            return struct.pack('<I', len(data)) + data
+        return data + b'\n'
+
+    def _frames(self, buf):
+        pos = 0
+        while pos < len(buf):
+            if self.record_serializer.binary:
+                if pos + 4 > len(buf):
+                    return
+                size, = struct.unpack_from('<I', buf, pos)
+                start, end = pos + 4, pos + 4 + size
+                if end > len(buf):
+                    return
+            else:
+                start, end = pos, buf.find(b'\n', pos)
+                if end == -1:
+                    return
+                end += 1
+
+            try:
+                record = decode(buf[start:end], self.record_serializer, self.journal_path)
+            except ValueError:
+                if end == len(buf):
+                    return
+                raise
+            yield record, end
+            pos = end
+
+    def _apply(self, record):
+        op = record['op']
+        if op == 'put':
+            self._mirror[record['user_id']] = record['data']
+        elif op == 'delete':
+            self._mirror.pop(record['user_id'], None)
+        elif op == 'score':
+            self._add_score(record['data'])
+
+    def _add_score(self, score):
+        self._scores.append(score)
+        self._scores.sort(key=lambda x: x['level'], reverse=True)
+        del self._scores[HISCORE_LIMIT:]
+
+    def load_scores(self, limit=HISCORE_LIMIT):
+        return [dict(score) for score in self._scores[:limit]]
+
+    def commit(self, changed, deleted, scores, reasons=None):
+        reasons = reasons or {}
+        records = []
+        for user_id, char in changed.items():
+            records.append({'op': 'put', 'reason': reasons.get(user_id, 'update'), 'user_id': user_id, 'data': char})
+        for user_id in deleted:
+            records.append({'op': 'delete', 'reason': reasons.get(user_id, 'death'), 'user_id': user_id})
+        for score in scores:
+            records.append({'op': 'score', 'reason': 'death', 'data': score})
+
+        frames = []
+        for record in records:
+            self._seq += 1
+            record['seq'] = self._seq
+            frames.append(self._frame(record))
+
+        with open(self.journal_path, 'ab') as f:
+            f.write(b''.join(frames))
+            f.flush()
+            os.fsync(f.fileno())
+
+        for record in records:
+            self._apply(record)
+        self._journal_records += len(records)
+
+        if self._journal_records >= self.compact_threshold:
+            self.compact()
+
+    def compact(self):
+        state = {'seq': self._seq, 'characters': self._mirror, 'scores': self._scores}
+        atomic_write(self.snapshot_path, self.serializer.dumps(state))
+        with open(self.journal_path, 'w'):
+            pass
+        self._journal_records = 0
+
+    def compacted(self):
+        self._journal_records = 0
+
+    def reader_spec(self):
+        return 'journal', {
+            'journal_path': self.journal_path,
+            'snapshot_path': self.snapshot_path,
+            'compact_threshold': self.compact_threshold,
+            'serializer': self.serializer,
+            'repair': False
+        }
+
+class ShardedBackend:
+    def __init__(self, root=SHARD_DIR, serializer=None):
+        self.root = root
+        self.serializer = serializer or get_serializer()
+        self.extension = '.bin' if self.serializer.binary else '.json'
+        self.hiscore_path = os.path.join(root, HISCORE_FILE)
+        os.makedirs(root, exist_ok=True)
+
+    def path_for(self, user_id):
+        digest = hashlib.sha1(user_id.encode()).hexdigest()
+        return os.path.join(self.root, digest[:2], f"{user_id}{self.extension}")
+
+    def exists(self, user_id):
+        return os.path.exists(self.path_for(user_id))
+
+    def load_one(self, user_id):
+        data = read_file(self.path_for(user_id))
+        return decode(data, self.serializer, self.path_for(user_id)) if data else None
+
+    def load(self):
+        other = '.json' if self.serializer.binary else '.bin'
+        characters = {}
+        for entry in os.scandir(self.root):
+            if not entry.is_dir():
+                continue
+            for shard in os.scandir(entry.path):
+                if shard.name.endswith(self.extension):
+                    char = decode(read_file(shard.path), self.serializer, shard.path)
+                    characters[char['user_id']] = char
+                elif shard.name.endswith(other):
+                    raise ValueError(
+                        f"{shard.path} was written by another serializer; "
+                        f"run: python storage.py convert --backend sharded --from <old> --to {serializer_name(self.serializer)}"
+                    )
+        return characters
+
+    def load_scores(self, limit=HISCORE_LIMIT):
+        return read_scores(self.hiscore_path, self.serializer, limit)
+
+    def reader_spec(self):
+        return 'sharded', {'root': self.root, 'serializer': self.serializer}
+
+    def commit(self, changed, deleted, scores, reasons=None):
+        for user_id, char in changed.items():
+            path = self.path_for(user_id)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            atomic_write(path, self.serializer.dumps(char))
+
+        for user_id in deleted:
+            try:
+                os.unlink(self.path_for(user_id))
+            except FileNotFoundError:
+                pass
+
+        if scores:
+            append_scores(self.hiscore_path, self.serializer, scores)
+
+BACKENDS = {
+    'json': JsonFileBackend,
+    'sqlite': SqliteBackend,
+    'journal': JournalBackend,
+    'sharded': ShardedBackend
+}
+
+def create_backend(name=STORAGE_BACKEND, **options):
+    try:
+        backend = BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown storage backend: {name}") from None
+    return backend(**options)
+
+def open_backend(spec):
+    name, options = spec
+    return create_backend(name, **options)
+
+class CharacterRepository:
+    def __init__(self, backend=None, flush_interval=FLUSH_INTERVAL, owner=None, lease_ttl=LEASE_TTL):
+        self.backend = backend or create_backend()
+        self.flush_interval = flush_interval
+        self.shared = getattr(self.backend, 'shared', False)
+        self.owner = owner or f"{socket.gethostname()}:{os.getpid()}"
+        self.lease_ttl = lease_ttl
+        self._characters = None
+        self._names = {}
+        self._dirty = {}
+        self._deleted = set()
+        self._scores = []
+        self._owned = set()
+        self._releases = set()
+        self._releasing = set()
+        self._flush_task = None
+        self._lease_task = None
+        self._flush_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='storage')
+        self.last_flush = None
+        self.last_flush_error = None
+
+    def load(self):
+        with STORAGE_SECONDS.time('load'):
+            self._characters = self._decode(self.backend.load())
+        self._names = {char.name.casefold(): user_id for user_id, char in self._characters.items()}
+        self._dirty.clear()
+        self._deleted.clear()
+        self._scores.clear()
+        if self.shared:
+            stale = self.backend.release_owner(self.owner)
+            if stale:
+                print(f"Released {stale} character leases left behind by a previous {self.owner}")
+        return self._characters
+
+    @staticmethod
+    def _decode(records):
+        characters = {}
+        for user_id, data in records.items():
+            try:
+                characters[user_id] = Character.from_dict(data)
+            except ValueError as e:
+                print(f"Skipping invalid character {user_id}: {e}")
+        return characters
+
+    @property
+    def characters(self):
+        if self._characters is None:
+            self.load()
+        return self._characters
+
+    @property
+    def pending(self):
+        return len(self._dirty) + len(self._deleted) + len(self._scores)
+
+    def get(self, user_id):
+        return self.characters.get(user_id)
+
+    def exists(self, user_id):
+        return user_id in self.characters
+
+    def values(self):
+        return self.characters.values()
+
+    def name_exists(self, name):
+        return name.casefold() in self._names
+
+    def _unindex(self, char):
+        key = char.name.casefold()
+        if self._names.get(key) == char.user_id:
+            del self._names[key]
+
+    def save(self, player, reason='update'):
+        user_id = player.user_id
+        previous = self.characters.get(user_id)
+        if previous is not player:
+            if previous is not None:
+                self._unindex(previous)
+            self._names[player.name.casefold()] = user_id
+        self.characters[user_id] = player
+        self._deleted.discard(user_id)
+        self._dirty[user_id] = reason
+        SAVES.inc(reason)
+
+        if self.flush_interval <= 0:
+            self._request_flush()
+
+    def delete(self, user_id, score=None):
+        char = self.characters.pop(user_id, None)
+        if char is None:
+            return
+        self._unindex(char)
+        self._dirty.pop(user_id, None)
+        self._deleted.add(user_id)
+        if score is not None:
+            self._scores.append(score)
+
+        self._request_flush()
+
+    def load_scores(self, limit=HISCORE_LIMIT):
+        return self.backend.load_scores(limit)
+
+    async def load_scores_async(self, limit=HISCORE_LIMIT):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, self.backend.load_scores, limit)
+
+    async def name_in_use(self, name):
+        if self.name_exists(name):
+            return True
+        if not self.shared:
+            return False
+        user_id = await asyncio.get_running_loop().run_in_executor(self._executor, self.backend.find_name, name)
+        return user_id is not None
+
+    async def acquire(self, user_id):
+        if not self.shared:
+            return True
+        if user_id in self._releases:
+            self._releases.discard(user_id)
+            return True
+        if user_id in self._owned and user_id not in self._releasing:
+            return True
+
+        claimed, data = await asyncio.get_running_loop().run_in_executor(self._executor, self._claim, user_id)
+        LEASES.inc('acquired' if claimed else 'busy')
+        if not claimed:
+            return False
+
+        self._owned.add(user_id)
+        if user_id not in self._dirty and user_id not in self._deleted:
+            self._refresh(user_id, data)
+        return True
+
+    def _claim(self, user_id):
+        if not self.backend.claim(user_id, self.owner, self.lease_ttl):
+            return False, None
+        return True, self.backend.load_one(user_id)
+
+    def _refresh(self, user_id, data):
+        previous = self.characters.pop(user_id, None)
+        if previous is not None:
+            self._unindex(previous)
+        if data is None:
+            return
+        try:
+            char = Character.from_dict(data)
+        except ValueError as e:
+            print(f"Skipping invalid character {user_id}: {e}")
+            return
+        self.characters[user_id] = char
+        self._names[char.name.casefold()] = user_id
+
+    async def reload(self, user_id):
+        if self.shared and user_id not in self._owned:
+            data = await asyncio.get_running_loop().run_in_executor(self._executor, self.backend.load_one, user_id)
+            if user_id not in self._owned and user_id not in self._dirty and user_id not in self._deleted:
+                self._refresh(user_id, data)
+        return self.get(user_id)
+
+    def release(self, user_id):
+        if user_id not in self._owned:
+            return
+        self._releases.add(user_id)
+        self._request_flush()
+
+    def _take_batch(self):
+        if not self.pending:
+            return None
+
+        changed = {user_id: self.characters[user_id].to_dict() for user_id in self._dirty}
+        deleted = set(self._deleted)
+        scores = list(self._scores)
+        reasons = dict(self._dirty)
+        self._dirty.clear()
+        self._deleted.clear()
+        self._scores.clear()
+        return changed, deleted, scores, reasons
+
+    def _take_releases(self):
+        releases = self._releases
+        self._releases = set()
+        self._releasing.update(releases)
+        return releases
+
+    def _commit(self, batch, releases):
+        if batch is not None:
+            self.backend.commit(*batch)
+        if releases:
+            self.backend.release(releases, self.owner)
+
+    def _restore(self, batch, releases):
+        self._releasing.difference_update(releases)
+        self._releases.update(releases)
+        if batch is not None:
+            self._restore_batch(batch)
+
+    def _restore_batch(self, batch):
+        changed, deleted, scores, reasons = batch
+        for user_id in changed:
+            if user_id in self.characters:
+                self._dirty.setdefault(user_id, reasons[user_id])
+        self._deleted.update(user_id for user_id in deleted if user_id not in self.characters)
+        self._scores[:0] = scores
+
+    def _request_flush(self):
+        if self._flush_task is not None and not self._flush_task.done():
+            self._wakeup.set()
+        else:
+            self.flush()
+
+    def flush(self):
+        batch = self._take_batch()
+        releases = self._take_releases()
+        if batch is None and not releases:
+            return
+
+        try:
+            with STORAGE_SECONDS.time('commit'):
+                self._commit(batch, releases)
+        except Exception as e:
+            self._restore(batch, releases)
+            self.last_flush_error = str(e)
+            raise
+        self._flushed(releases)
+
+    async def flush_async(self):
+        async with self._flush_lock:
+            batch = self._take_batch()
+            releases = self._take_releases()
+            if batch is None and not releases:
+                return
+
+            loop = asyncio.get_running_loop()
+            try:
+                with STORAGE_SECONDS.time('commit'):
+                    await loop.run_in_executor(self._executor, self._commit, batch, releases)
+            except Exception as e:
+                self._restore(batch, releases)
+                self.last_flush_error = str(e)
+                raise
+            self._flushed(releases)
+
+    def exclusive(self):
+        return self._flush_lock
+
+    def _flushed(self, releases=()):
+        self._owned.difference_update(releases)
+        self._releasing.difference_update(releases)
+        self.last_flush = time.time()
+        self.last_flush_error = None
+
+    def health(self):
+        return {
+            'ok': self._characters is not None and self.last_flush_error is None,
+            'loaded': self._characters is not None,
+            'pending': self.pending,
+            'owned': len(self._owned),
+            'last_flush': self.last_flush,
+            'last_flush_error': self.last_flush_error
+        }
+
+    async def _flush_loop(self):
+        timeout = self.flush_interval if self.flush_interval > 0 else None
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            try:
+                await self.flush_async()
+            except Exception as e:
+                print(f"Error flushing character data: {e}")
+
+    async def _lease_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.lease_ttl / 3)
+            owned = self._owned - self._releasing
+            if not owned:
+                continue
+
+            try:
+                lost = await loop.run_in_executor(self._executor, self.backend.renew, owned, self.owner, self.lease_ttl)
+            except Exception as e:
+                print(f"Error renewing character leases: {e}")
+                continue
+            for user_id in lost:
+                print(f"Lost ownership of character {user_id} to another process")
+                self._owned.discard(user_id)
+
+    def start(self):
+        loop = asyncio.get_running_loop()
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = loop.create_task(self._flush_loop())
+        if self.shared and (self._lease_task is None or self._lease_task.done()):
+            self._lease_task = loop.create_task(self._lease_loop())
+
+    async def stop(self):
+        if self._lease_task is not None:
+            self._lease_task.cancel()
+            self._lease_task = None
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        self._releases.update(self._owned)
+        await self.flush_async()
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        self._releases.update(self._owned)
+        self.flush()
+        if hasattr(self.backend, 'compact'):
+            self.backend.compact()
+        if hasattr(self.backend, 'close'):
+            self.backend.close()
+
+def migrate_json_to_sqlite(db_path=DBFILE, hiscore_path=HISCORE_FILE, sqlite_path=SQLITE_FILE):
+    source = JsonFileBackend(db_path, hiscore_path, SERIALIZERS['pretty'])
+    target = SqliteBackend(sqlite_path)
+    characters = source.load()
+    scores = source.load_scores()
+
+    try:
+        with target.transaction() as cur:
+            cur.execute("DELETE FROM characters")
+            cur.execute("DELETE FROM leaderboard")
+        target.commit(characters, set(), scores)
+    finally:
+        target.close()
+
+    return len(characters), len(scores)
+
+def migrate_json_to_sharded(db_path=DBFILE, hiscore_path=HISCORE_FILE, root=SHARD_DIR):
+    source = JsonFileBackend(db_path, hiscore_path, SERIALIZERS['pretty'])
+    target = ShardedBackend(root)
+    characters = source.load()
+    scores = source.load_scores()
+
+    target.commit(characters, set(), [])
+    atomic_write(target.hiscore_path, target.serializer.dumps(scores))
+
+    return len(characters), len(scores)
+
+def convert_store(name=STORAGE_BACKEND, source_serializer='compact', target_serializer=STORAGE_SERIALIZER):
+    source = create_backend(name, serializer=get_serializer(source_serializer))
+    target = create_backend(name, serializer=get_serializer(target_serializer))
+    try:
+        characters = source.load()
+        scores = source.load_scores()
+
+        if isinstance(target, JournalBackend):
+            target._mirror, target._scores, target._seq = source._mirror, source._scores, source._seq
+            target.compact()
+        else:
+            target.commit(characters, set(), [])
+            if isinstance(target, ShardedBackend) and target.extension != source.extension:
+                for user_id in characters:
+                    os.unlink(source.path_for(user_id))
+            if hasattr(target, 'hiscore_path'):
+                atomic_write(target.hiscore_path, target.serializer.dumps(scores))
+    finally:
+        for backend in (source, target):
+            if hasattr(backend, 'close'):
+                backend.close()
+
+    return len(characters), len(scores)
+
+def main():
+    parser = argparse.ArgumentParser(description="Roguelike bot storage tools")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    migrate = subparsers.add_parser('migrate-sqlite', help="Copy the JSON database and hiscores into SQLite")
+    migrate.add_argument('--db', default=DBFILE)
+    migrate.add_argument('--hiscore', default=HISCORE_FILE)
+    migrate.add_argument('--sqlite', default=SQLITE_FILE)
+
+    shard = subparsers.add_parser('migrate-sharded', help="Split the JSON database into per-user files")
+    shard.add_argument('--db', default=DBFILE)
+    shard.add_argument('--hiscore', default=HISCORE_FILE)
+    shard.add_argument('--root', default=SHARD_DIR)
+
+    convert = subparsers.add_parser('convert', help="Re-encode a store after changing STORAGE_SERIALIZER")
+    convert.add_argument('--backend', default=STORAGE_BACKEND, choices=list(BACKENDS))
+    convert.add_argument('--from', dest='source', required=True, choices=list(SERIALIZERS))
+    convert.add_argument('--to', dest='target', default=STORAGE_SERIALIZER, choices=list(SERIALIZERS))
+
+    args = parser.parse_args()
+
+    if args.command == 'migrate-sqlite':
+        count, scores = migrate_json_to_sqlite(args.db, args.hiscore, args.sqlite)
+        print(f"Migrated {count} characters and {scores} hiscores to {args.sqlite}")
+    elif args.command == 'migrate-sharded':
+        count, scores = migrate_json_to_sharded(args.db, args.hiscore, args.root)
+        print(f"Migrated {count} characters and {scores} hiscores to {args.root}")
+    elif args.command == 'convert':
+        count, scores = convert_store(args.backend, args.source, args.target)
+        print(f"Converted {count} characters and {scores} hiscores from {args.source} to {args.target}")
+
+if __name__ == '__main__':
+    main()
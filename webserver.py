@@ -1,14 +1,64 @@
-from flask import Flask
-from threading import Thread
-
-app = Flask('')
-@app.route('/')
-def home():
-    return "rougelike is online"
-
-def run():
-    app.run(host="0.0.0.0", port=8080)
-    
-def keep_alive():
-    t = Thread(target=run)
-    t.start()
\ No newline at end of file
+import os
+import math
+from aiohttp import web
+import metrics
+
+WEB_HOST = os.getenv('WEB_HOST', '0.0.0.0')
+WEB_PORT = int(os.getenv('WEB_PORT', '8080'))
+
+class WebServer:
+    def __init__(self, bot, characters, host=WEB_HOST, port=WEB_PORT):
+        self.bot = bot
+        self.characters = characters
+        self.host = host
+        self.port = port
+        self.runner = None
+        self.app = web.Application()
+        self.app.router.add_get('/', self.home)
+        self.app.router.add_get('/health', self.health)
+        self.app.router.add_get('/ready', self.ready)
+        self.app.router.add_get('/metrics', self.metrics_endpoint)
+
+    async def start(self):
+        if not self.port or self.runner is not None:
+            return
+        self.runner = web.AppRunner(self.app, access_log=None)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, self.host, self.port).start()
+
+    async def stop(self):
+        if self.runner is not None:
+            await self.runner.cleanup()
+            self.runner = None
+
+    def gateway_status(self):
+        latency = self.bot.latency
+        shards = getattr(self.bot, 'shards', None)
+        if shards is not None:
+            connected = bool(shards) and not any(shard.is_closed() for shard in shards.values())
+        else:
+            connected = self.bot.ws is not None and self.bot.ws.open
+        return {
+            'ok': self.bot.is_ready() and not self.bot.is_closed() and connected,
+            'latency': latency if math.isfinite(latency) else None,
+            'guilds': len(self.bot.guilds),
+            'shards': sorted(shards) if shards is not None else None
+        }
+
+    async def home(self, request):
+        return web.Response(text="rougelike is online")
+
+    async def health(self, request):
+        return web.json_response({'ok': True})
+
+    async def ready(self, request):
+        gateway = self.gateway_status()
+        storage = self.characters.health()
+        ready = gateway['ok'] and storage['ok']
+        return web.json_response(
+            {'ready': ready, 'gateway': gateway, 'storage': storage},
+            status=200 if ready else 503
+        )
+
+    async def metrics_endpoint(self, request):
+        return web.Response(text=metrics.REGISTRY.render(), content_type='text/plain', charset='utf-8')